@@ -5,10 +5,24 @@ import json
 
 from pymatgen.core import Structure
 from pymatgen.io.vasp import Vasprun
+from EnsembleFFFit.matensemble.run_state import RunStateDB
 
 class DirectoryParser(ABC):
-    def __init__(self, directory_to_parse):
+    def __init__(self, directory_to_parse, state_db=None):
         self.directory_to_parse = Path(directory_to_parse)
+        self.state_db = state_db
+
+    def walk_roots(self):
+        """
+        Directories to check; the done output directories from the run-state
+        database when one is given, otherwise every directory below directory_to_parse.
+        """
+        if self.state_db is not None:
+            db = RunStateDB(self.state_db)
+            roots = db.output_dirs(under=self.directory_to_parse)
+            db.close()
+            return [Path(root) for root in roots]
+        return [Path(root) for root, _, _ in os.walk(self.directory_to_parse)]
 
     @abstractmethod
     def parse_directory(self, label_tuple):
@@ -64,8 +78,7 @@ class ASEParser(DirectoryParser):
     def parse_directory(self, label_tuple):
         full_dct = {}
 
-        for root, _, _ in os.walk(self.directory_to_parse):
-            root = Path(root)
+        for root in self.walk_roots():
 
             try:
                 props, poscar = self.existence_check(root)
@@ -113,8 +126,7 @@ class VASPParser(DirectoryParser):
     def parse_directory(self, label_tuple):
         full_dct = {}
 
-        for root, _, _ in os.walk(self.directory_to_parse):
-            root = Path(root)
+        for root in self.walk_roots():
 
             try:
                 vasprun_path = self.existence_check(root)
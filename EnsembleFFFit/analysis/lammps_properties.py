@@ -7,8 +7,11 @@ from pymatgen.io.lammps.outputs import parse_lammps_dumps
 from pymatgen.io.lammps.outputs import parse_lammps_log
 from pymatgen.io.vasp.outputs import Vasprun
 from pymatgen.io.ase import AseAtomsAdaptor
+from ase import Atoms
 from ase.io import read
 from EnsembleFFFit.utils.copy_by_pattern_cli import get_atom_mapping_from_control
+from EnsembleFFFit.matensemble.run_state import RunStateDB
+from EnsembleFFFit.matensemble.results import load_results, find_results_files
 import numpy as np
 from copy import deepcopy
 
@@ -91,13 +94,59 @@ def get_forces(dump_path, units):
         fzs = [uc.convert(fz, 'kcal/mol', 'eV/atom', 'energy') for fz in fzs]
     return fxs, fys, fzs
 
+def convert_units(values, units):
+    if units == 'real': # In kcal/mol
+        uc = UnitConverter()
+        return [uc.convert(v, 'kcal/mol', 'eV/atom', 'energy') for v in values]
+    return list(values)
+
+def parse_results_files(path_to_images, results_file, units='metal', ffield_label=(-5, -3), roots=None):
+    """
+    Same output as parse_single_points, read from the per-batch results files written by the
+    drivers (--results_file) instead of the log and dump files.
+    """
+    data = {}
+    roots = set(roots) if roots is not None else None
+    for results_path in find_results_files(os.path.abspath(path_to_images), results_file):
+        for root, record in load_results(results_path).items():
+            if roots is not None and root not in roots:
+                continue
+            energy = convert_units([record['energy']], units)[0]
+            fxs, fys, fzs = [convert_units(record['forces'][:, i], units) for i in range(3)]
+            e_atoms = convert_units(record['eatom'], units) if not np.isnan(record['eatom']).all() else []
+
+            atoms = Atoms(symbols=record['symbols'], positions=record['positions'], cell=record['cell'], pbc=True)
+            atoms.arrays['forces'] = record['forces']
+            atoms.info['energy'] = energy
+
+            p = Path(root)
+            md = p.parent.name
+            original_image = int(re.findall(r'\d+', p.name)[0])
+            ffield = "_".join(root.split("/")[ffield_label[0]:ffield_label[1]])
+            nested_set(data, [ffield, md, original_image], {'energy': energy, 'atoms': atoms, 'e_atoms': e_atoms,
+                                               'fx': fxs, 'fy': fys, 'fz': fzs})
+    return data
+
 def parse_single_points(path_to_images,
                             dump_index = 0,
                             energy_label='PotEng',
                             units='metal',
-                        ffield_label=(-5, -3)):
+                        ffield_label=(-5, -3),
+                        state_db=None,
+                        results_file=None):
     data = {}
-    for root, _, _ in os.walk(os.path.abspath(path_to_images)):
+    if state_db is not None: # Only visit the output directories of finished tasks
+        db = RunStateDB(state_db)
+        roots = db.output_dirs(under=path_to_images)
+        db.close()
+    else:
+        roots = [root for root, _, _ in os.walk(os.path.abspath(path_to_images))]
+
+    if results_file is not None: # Results written in memory by the drivers; no log/dump parsing
+        return parse_results_files(path_to_images, results_file, units=units, ffield_label=ffield_label,
+                                   roots=roots if state_db is not None else None)
+
+    for root in roots:
         log_paths = glob.glob(os.path.join(root, '*.lammps'))
         for log_path in log_paths:
             
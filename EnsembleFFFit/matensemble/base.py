@@ -6,18 +6,48 @@ import numpy as np
 from itertools import product
 from copy import deepcopy
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, Counter
 from typing import List, Tuple
 import os
 import glob
+import json
 import warnings
 import sys
+import heapq
+from EnsembleFFFit.matensemble.run_state import RunStateDB, STATE_DB_ENV, FFIELD_LABELS
+from EnsembleFFFit.matensemble.results import RESULTS_ENV, write_cached_results
+from EnsembleFFFit.matensemble.staging import STAGE_ENV
+from EnsembleFFFit.matensemble.eval_cache import CACHE_ENV, EvalCache
+from EnsembleFFFit.matensemble.model_manifest import converted_models
+
+# Input labels that identify the recipe (input script or fit configuration) of a task
+RECIPE_LABELS = ['in_lammps', 'config']
+
+# Destinations of add_report_arguments; planners that forward their arguments to a task leave these out
+REPORT_ARGUMENTS = ['full', 'nodes', 'cores_per_node', 'gpus_per_node', 'seconds_per_atom', 'seconds_per_task']
+
+def add_report_arguments(parser):
+    ''' Dry-run report options shared by the MatEnsemble CLIs '''
+    parser.add_argument("--full", help="With --dry_run, also list every run path", action='store_true')
+    parser.add_argument("--nodes", help="Nodes assumed for the dry-run makespan estimate", type=int, default=1)
+    parser.add_argument("--cores_per_node", help="Cores per node for the dry-run estimate", type=int, default=128)
+    parser.add_argument("--gpus_per_node", help="GPUs per node for the dry-run estimate", type=int, default=4)
+    parser.add_argument("--seconds_per_atom", help="Wall seconds per atom per structure on one task, for the dry-run estimate", type=float, default=None)
+    parser.add_argument("--seconds_per_task", help="Wall seconds per run path, for the dry-run estimate", type=float, default=None)
+    return parser
+
+def report_options(args):
+    return {'full': args.full, 'nodes': args.nodes, 
+            'cores_per_node': args.cores_per_node, 'gpus_per_node': args.gpus_per_node,
+            'seconds_per_atom': args.seconds_per_atom, 'seconds_per_task': args.seconds_per_task}
 
 class MatEnsembleJob(ABC):
     def __init__(self, run_directory, inputs_directory, **kwargs):
         self.run_directory = run_directory
         self.inputs_directory = inputs_directory
         self.options = kwargs
+        self.n_skipped_finished = 0 # tasks dropped by the finished_file filters
+        self.atom_counts = {} # structure path -> number of atoms, filled by get_tasks where known
 
     @abstractmethod
     def sorting_function(self, paths): pass
@@ -142,6 +172,7 @@ class MatEnsembleJob(ABC):
                 if os.path.isdir(task_dir) and finished_file is not None:
                     pattern = os.path.join(task_dir, finished_file)
                     if glob.glob(pattern):
+                        self.n_skipped_finished += 1
                         continue # finished_file pattern already written
 
                 task_dirs.append(task_dir)
@@ -209,6 +240,7 @@ class MatEnsembleJob(ABC):
                     if os.path.isdir(mod_task_dir) and finished_file is not None:
                         pattern = os.path.join(mod_task_dir, finished_file)
                         if glob.glob(pattern):
+                            self.n_skipped_finished += 1
                             continue
 
                     task_dirs.append(mod_task_dir)
@@ -394,42 +426,345 @@ class MatEnsembleJob(ABC):
             python_exe = 'python'
         return python_exe
 
-    def dry_run(self, paths, task_command, tasks, cpus_per_task, gpus_per_task):
+    def dry_run(self, paths, task_command, tasks, cpus_per_task, gpus_per_task,
+                state_tasks=None, full=False, **report):
+        """
+        Print a planning summary; with full=True also list every path.
+        report keywords are passed to planning_report (node counts and cost model).
+        """
         print(f'Task Command: {task_command}\n')
-        for i, path in enumerate(paths):
-            print(f'path: {paths[i]}, tasks: {tasks[i]}\n')
+        if full:
+            for i, path in enumerate(paths):
+                print(f'path: {paths[i]}, tasks: {tasks[i]}\n')
+        for line in self.planning_report(paths, tasks, cpus_per_task, gpus_per_task, state_tasks, **report):
+            print(line)
         print(f'Total tasks = {int(np.sum(tasks))}; cpus_per_task={cpus_per_task}; gpus_per_task={gpus_per_task}')
 
+    def estimate_batch_seconds(self, batch_natoms, n_tasks, seconds_per_atom=None, seconds_per_task=None):
+        """
+        Wall time of one batch: structures run one after another, each with n_tasks ranks
+        (ideal scaling of seconds_per_atom), or a flat seconds_per_task per run path.
+        """
+        if seconds_per_atom is not None and batch_natoms and all(n is not None for n in batch_natoms):
+            return float(np.sum(batch_natoms)) * seconds_per_atom / max(n_tasks, 1)
+        if seconds_per_task is not None:
+            return seconds_per_task * len(batch_natoms)
+        return None
+
+    def simulate_makespan(self, walls, cores, gpus, nodes, cores_per_node, gpus_per_node):
+        """
+        Greedy longest-first list schedule of the batches on nodes * cores_per_node cores
+        (and GPUs); returns the estimated makespan in seconds, or None if a batch cannot fit.
+        """
+        total_cores, total_gpus = nodes * cores_per_node, nodes * gpus_per_node
+        if any(c > total_cores or g > total_gpus for c, g in zip(cores, gpus)):
+            return None
+        pending = sorted(zip(walls, cores, gpus), reverse=True)
+        running, t = [], 0.0
+        free_cores, free_gpus = total_cores, total_gpus
+        while pending or running:
+            for job in list(pending):
+                if job[1] <= free_cores and job[2] <= free_gpus:
+                    heapq.heappush(running, (t + job[0], job[1], job[2]))
+                    free_cores -= job[1]
+                    free_gpus -= job[2]
+                    pending.remove(job)
+            t, c, g = heapq.heappop(running)
+            free_cores += c
+            free_gpus += g
+        return t
+
+    def planning_report(self, paths, tasks, cpus_per_task, gpus_per_task, state_tasks=None,
+                        nodes=1, cores_per_node=128, gpus_per_node=4,
+                        seconds_per_atom=None, seconds_per_task=None, top=10):
+        lines = ['===== Planning report =====']
+        lines.append(f'Batches: {len(paths)}; skipped by finished_file: {self.n_skipped_finished}')
+
+        # Group the unbatched tasks by batch and count them per ffield / recipe
+        if state_tasks is None:
+            state_tasks = [(p, p, {}) for p in paths]
+        by_batch = defaultdict(list)
+        for run_path, batch_path, inputs in state_tasks:
+            by_batch[batch_path].append(inputs)
+        lines.append(f'Run paths: {len(state_tasks)}')
+
+        for label in FFIELD_LABELS + RECIPE_LABELS:
+            counts = Counter(inputs[label] for _, _, inputs in state_tasks if label in inputs)
+            if not counts:
+                continue
+            lines.append(f'Tasks per {label} ({len(counts)} unique):')
+            for value, n in counts.most_common(top):
+                lines.append(f'  {n:>8d}  {value}')
+            if len(counts) > top:
+                lines.append(f'  ... {len(counts) - top} more')
+
+        # Atom-count histogram over the unbatched tasks
+        atom_counts = self.atom_counts
+        natoms = [atom_counts.get(inputs.get('structure')) for _, _, inputs in state_tasks]
+        known = [n for n in natoms if n is not None]
+        if known:
+            edges = [0] + [2**i for i in range(int(np.ceil(np.log2(max(known) + 1))) + 1)]
+            hist, edges = np.histogram(known, bins=edges)
+            lines.append('Atoms per structure:')
+            for lo, hi, n in zip(edges[:-1], edges[1:], hist):
+                if n:
+                    lines.append(f'  {int(lo):>7d}-{int(hi) - 1:<7d} {n:>8d}  {"#" * int(np.ceil(40 * n / max(hist)))}')
+
+        # Cost model per batch
+        cpus = np.broadcast_to(cpus_per_task, (len(paths),))
+        gpus = np.broadcast_to(gpus_per_task, (len(paths),))
+        walls, batch_sizes = [], []
+        for i, path in enumerate(paths):
+            batch_natoms = [atom_counts.get(inputs.get('structure')) for inputs in by_batch.get(path, [{}])]
+            batch_sizes.append(len(batch_natoms))
+            walls.append(self.estimate_batch_seconds(batch_natoms, tasks[i], seconds_per_atom, seconds_per_task))
+
+        if paths and all(w is not None for w in walls):
+            core_counts = [int(tasks[i] * cpus[i]) for i in range(len(paths))]
+            gpu_counts = [int(tasks[i] * gpus[i]) for i in range(len(paths))]
+            core_hours = np.sum(np.multiply(walls, core_counts)) / 3600
+            gpu_hours = np.sum(np.multiply(walls, gpu_counts)) / 3600
+            lines.append(f'Estimated core-hours: {core_hours:.1f}; gpu-hours: {gpu_hours:.1f}')
+            makespan = self.simulate_makespan(walls, core_counts, gpu_counts, nodes, cores_per_node, gpus_per_node)
+            if makespan is None:
+                lines.append(f'Estimated makespan on {nodes} nodes: a batch needs more than {nodes} nodes provide')
+            else:
+                lines.append(f'Estimated makespan on {nodes} nodes ({cores_per_node} cores, {gpus_per_node} gpus each): {makespan / 3600:.2f} h')
+        else:
+            lines.append('Cost estimate: pass --seconds_per_atom or --seconds_per_task')
+
+        # Largest batches, by estimated time when available
+        order = sorted(range(len(paths)), key=lambda i: (walls[i] or 0, batch_sizes[i]), reverse=True)
+        lines.append(f'Largest batches (top {min(top, len(paths))}):')
+        for i in order[:top]:
+            wall = f', ~{walls[i] / 60:.1f} min' if walls[i] is not None else ''
+            lines.append(f'  {batch_sizes[i]:>6d} runs, {tasks[i]} tasks{wall}: {paths[i]}')
+        return lines
+
+    def drop_done_tasks(self, task_arg_list, run_paths, state_db):
+        ''' Remove (unbatched) tasks whose run path is marked done in the run-state database '''
+        db = RunStateDB(state_db)
+        done = db.done_run_paths()
+        db.close()
+        keep = [i for i, run_path in enumerate(run_paths) if run_path not in done]
+        return [task_arg_list[i] for i in keep], [run_paths[i] for i in keep]
+
+    def state_tasks_from_runs(self, task_arg_list, run_paths, labels):
+        ''' (run_path, batch_path, inputs) records for unbatched tasks, one batch per run path '''
+        return [(run_path, run_path, dict(zip(labels, task_arg_list[i]))) for i, run_path in enumerate(run_paths)]
+
+    def state_tasks_from_batches(self, batched_tasks, batch_paths, labels):
+        ''' (run_path, batch_path, inputs) records for the output of batch_by_parent_v2 '''
+        state_tasks = []
+        for batch, batch_path in zip(batched_tasks, batch_paths):
+            for j, run_path in enumerate(batch[-1]):
+                state_tasks.append((run_path, batch_path, {label: batch[k][j] for k, label in enumerate(labels)}))
+        return state_tasks
+
+    def natoms_by_run_path(self, state_tasks):
+        ''' {run_path: number of atoms} for the state tasks whose structure size is known '''
+        return {run_path: self.atom_counts[inputs['structure']] for run_path, _, inputs in state_tasks
+                if inputs.get('structure') in self.atom_counts}
+
+    def record_cached_results(self, cached_results, cached_state_tasks, results_file, state_db=None):
+        """
+        Write {run_path: record} taken from the evaluation cache to the cached file of
+        results_file, and record those tasks as done in the run-state database.
+        """
+        if not cached_results:
+            return
+        write_cached_results(cached_results, results_file)
+        if state_db is not None:
+            db = RunStateDB(state_db)
+            db.record_plan(cached_state_tasks, status='done')
+            db.close()
+
     def run(self, dry_run, task_command, run_tasks, 
                   cpus_per_task, gpus_per_task, 
                   task_arg_list, task_dir_list,
-                  make_paths_list, 
-                  write_restart_freq=1000000, buffer_time=1):
+                  make_paths_list=None, 
+                  write_restart_freq=1000000, buffer_time=1,
+                  state_db=None, state_tasks=None, report=None, results_file=None, stage_dir=None,
+                  eval_cache=None, cached_results=None, cached_state_tasks=None):
 
         if dry_run:
-            self.dry_run(task_dir_list, task_command, run_tasks, cpus_per_task, gpus_per_task)
+            self.dry_run(task_dir_list, task_command, run_tasks, cpus_per_task, gpus_per_task,
+                         state_tasks=state_tasks, **(report or {}))
         else:
-            from matensemble.manager import SuperFluxManager
-            
-            # Make a task list
-            task_list=[i for i in range(len(run_tasks))]
-
-            master = SuperFluxManager(gen_task_list=task_list,
-                                  gen_task_cmd=task_command,
-                                  tasks_per_job=run_tasks,
-                                  cores_per_task=cpus_per_task,
-                                  gpus_per_task=gpus_per_task,
-                                  write_restart_freq=1000000)
-            
-            # Make directories for outputs if they do not exist
-            for make_path in make_paths_list:
-                os.makedirs(make_path, exist_ok=True)
-
-            master.poolexecutor(task_arg_list=task_arg_list,
-                            buffer_time=1,
-                            task_dir_list=task_dir_list)
+            self.record_cached_results(cached_results, cached_state_tasks, results_file, state_db)
+            self.execute(task_command, run_tasks, cpus_per_task, gpus_per_task,
+                         task_arg_list, task_dir_list, make_paths_list,
+                         write_restart_freq=write_restart_freq, buffer_time=buffer_time,
+                         state_db=state_db, state_tasks=state_tasks, results_file=results_file,
+                         stage_dir=stage_dir, eval_cache=eval_cache)
         return 
 
+    def execute(self, task_command, run_tasks, cpus_per_task, gpus_per_task,
+                task_arg_list, task_dir_list, make_paths_list=None,
+                write_restart_freq=1000000, buffer_time=1,
+                state_db=None, state_tasks=None, results_file=None, stage_dir=None, eval_cache=None):
+        ''' Hand the task lists to a SuperFluxManager; cpus/gpus_per_task may be per-task lists '''
+        from matensemble.manager import SuperFluxManager
+
+        # Record the plan and point the drivers at the run-state database
+        if state_db is not None:
+            db = RunStateDB(state_db)
+            db.record_plan(state_tasks if state_tasks is not None else [(p, p, {}) for p in task_dir_list],
+                           task_command=task_command, 
+                           cpus_per_task=cpus_per_task if np.isscalar(cpus_per_task) else None,
+                           gpus_per_task=gpus_per_task if np.isscalar(gpus_per_task) else None)
+            if state_tasks:
+                db.set_natoms(self.natoms_by_run_path(state_tasks))
+            os.environ[STATE_DB_ENV] = db.db_path
+            db.close()
+
+        # Drivers that support it write one results file per batch directory
+        if results_file is not None:
+            os.environ[RESULTS_ENV] = results_file
+
+        # Drivers that support it copy shared inputs to this node-local directory once per node
+        if stage_dir is not None:
+            os.environ[STAGE_ENV] = stage_dir
+
+        # Drivers that support it reuse and extend this evaluation cache
+        if eval_cache is not None:
+            os.environ[CACHE_ENV] = os.path.abspath(eval_cache)
+
+        # Make a task list
+        task_list=[i for i in range(len(run_tasks))]
+
+        master = SuperFluxManager(gen_task_list=task_list,
+                              gen_task_cmd=task_command,
+                              tasks_per_job=run_tasks,
+                              cores_per_task=cpus_per_task,
+                              gpus_per_task=gpus_per_task,
+                              write_restart_freq=write_restart_freq)
+        
+        # Make directories for outputs if they do not exist
+        for make_path in (make_paths_list if make_paths_list is not None else task_dir_list):
+            os.makedirs(make_path, exist_ok=True)
+
+        master.poolexecutor(task_arg_list=task_arg_list,
+                        buffer_time=buffer_time,
+                        task_dir_list=task_dir_list)
+        return
+
+
+class CompositeMatEnsemble(MatEnsembleJob):
+    """
+    Co-schedules the planned tasks of several MatEnsembleJob objects in one allocation.
+
+    Each component keeps its own task command and cpus/gpus per task. The merged
+    task list is launched through composite_task.py, which looks up the component
+    command by index, so GPU fits and CPU single points share one SuperFluxManager.
+    """
+    def __init__(self, run_directory='.', inputs_directory='.', **kwargs):
+        super().__init__(run_directory, inputs_directory, **kwargs)
+        self.components = []
+
+    def sorting_function(self, path):
+        return str.lower
+
+    def get_tasks(self, paths):
+        return [task for component in self.components for task in component['run_tasks']]
+
+    def add_component(self, job, task_command, run_tasks, 
+                      cpus_per_task, gpus_per_task, 
+                      task_arg_list, task_dir_list, 
+                      make_paths_list=None, label=None, state_tasks=None,
+                      cached_results=None, cached_state_tasks=None):
+        ''' Register the run() arguments planned by a MatEnsembleJob '''
+        if state_tasks is None:
+            state_tasks = [(p, p, {}) for p in task_dir_list]
+        self.components.append({'job': job,
+                                'state_tasks': state_tasks,
+                                'cached_results': cached_results,
+                                'cached_state_tasks': cached_state_tasks,
+                                'label': label if label else type(job).__name__,
+                                'task_command': task_command,
+                                'run_tasks': list(run_tasks),
+                                'cpus_per_task': cpus_per_task,
+                                'gpus_per_task': gpus_per_task,
+                                'task_arg_list': list(task_arg_list),
+                                'task_dir_list': list(task_dir_list),
+                                'make_paths_list': list(make_paths_list) if make_paths_list is not None else list(task_dir_list)})
+
+    def merge_components(self):
+        """
+        Interleave the component task lists round-robin so that CPU and GPU tasks
+        are both near the front of the queue. Returns per-task lists:
+        (component_indices, run_tasks, cpus_per_task, gpus_per_task, task_arg_list, task_dir_list)
+        """
+        merged = ([], [], [], [], [], [])
+        longest = max([len(c['run_tasks']) for c in self.components], default=0)
+        for i in range(longest):
+            for c_idx, c in enumerate(self.components):
+                if i >= len(c['run_tasks']):
+                    continue
+                merged[0].append(c_idx)
+                merged[1].append(c['run_tasks'][i])
+                merged[2].append(c['cpus_per_task'])
+                merged[3].append(c['gpus_per_task'])
+                merged[4].append([c_idx] + list(c['task_arg_list'][i]))
+                merged[5].append(c['task_dir_list'][i])
+        return merged
+
+    def write_commands(self, commands_file):
+        ''' Write the index -> task command lookup used by composite_task.py '''
+        commands_file = os.path.abspath(commands_file)
+        with open(commands_file, 'w') as fh:
+            json.dump([c['task_command'] for c in self.components], fh, indent=4)
+        return commands_file
+
+    def dry_run(self, paths, task_command, tasks, cpus_per_task, gpus_per_task,
+                state_tasks=None, full=False, **report):
+        for c in self.components: # Structure sizes for the composite histogram and cost estimates
+            self.atom_counts.update(c['job'].atom_counts)
+        for c in self.components:
+            print(f"----- {c['label']} -----")
+            c['job'].dry_run(c['task_dir_list'], c['task_command'], c['run_tasks'], 
+                             c['cpus_per_task'], c['gpus_per_task'],
+                             state_tasks=c['state_tasks'], full=full, **report)
+        print('===== Composite =====')
+        for line in self.planning_report(paths, tasks, cpus_per_task, gpus_per_task,
+                                         [t for c in self.components for t in c['state_tasks']], **report)[1:]:
+            print(line)
+        print(f'Total composite tasks = {int(np.sum(tasks))}; '
+              f'cpu cores = {int(np.sum(np.multiply(tasks, cpus_per_task)))}; '
+              f'gpus = {int(np.sum(np.multiply(tasks, gpus_per_task)))}')
+
+    def run(self, dry_run, commands_file='composite_commands.json', 
+            write_restart_freq=1000000, buffer_time=1, state_db=None, report=None, results_file=None,
+            stage_dir=None, eval_cache=None):
+        if not self.components:
+            raise ValueError('No components added to the composite job!')
+
+        _, run_tasks, cpus, gpus, task_arg_list, task_dir_list = self.merge_components()
+        if dry_run:
+            self.dry_run(task_dir_list, None, run_tasks, cpus, gpus, **(report or {}))
+            return
+
+        commands_file = self.write_commands(commands_file)
+        dispatcher = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'composite_task.py')
+        task_command = f"{self.get_python()} {dispatcher} {commands_file}"
+
+        make_paths_list = [p for c in self.components for p in c['make_paths_list']]
+        if state_db is not None:
+            db = RunStateDB(state_db)
+            for c in self.components:
+                db.record_plan(c['state_tasks'], task_command=c['task_command'],
+                               cpus_per_task=c['cpus_per_task'], gpus_per_task=c['gpus_per_task'])
+                db.set_natoms(c['job'].natoms_by_run_path(c['state_tasks']))
+            db.close()
+        for c in self.components:
+            c['job'].record_cached_results(c['cached_results'], c['cached_state_tasks'], results_file, state_db)
+        self.execute(task_command, run_tasks, cpus, gpus, 
+                     task_arg_list, task_dir_list, make_paths_list,
+                     write_restart_freq=write_restart_freq, buffer_time=buffer_time,
+                     state_db=state_db, state_tasks=[], results_file=results_file, stage_dir=stage_dir,
+                     eval_cache=eval_cache)
+        return
+
 
 class LammpsMatEnsemble(MatEnsembleJob):
     def __init__(self, run_directory, inputs_directory, **kwargs):
@@ -488,8 +823,44 @@ class LammpsMatEnsemble(MatEnsembleJob):
 
     def get_tasks(self, structure_paths, atoms_per_task=10):
         ''' Set based on structure length '''
-        structures = [self.read_structure_from_lammps(path) for path in structure_paths]
-        return [max(np.floor(len(s)/atoms_per_task).astype(int), 1) for i, s in enumerate(structures)]
+        for path in structure_paths:
+            if path not in self.atom_counts:
+                self.atom_counts[path] = len(self.read_structure_from_lammps(path))
+        return [max(np.floor(self.atom_counts[path]/atoms_per_task).astype(int), 1) for path in structure_paths]
+
+    def keep_converted_models(self, task_arg_list, run_paths, labels, manifest):
+        ''' Keep the (unbatched) tasks whose ffield is a current converted model in the manifest '''
+        converted = converted_models(manifest)
+        ffield = labels.index('ffield')
+        keep = [i for i, task_arg in enumerate(task_arg_list) if os.path.abspath(task_arg[ffield]) in converted]
+        if len(keep) < len(task_arg_list):
+            print(f'{len(task_arg_list) - len(keep)} tasks skipped: their ffield is not a current model in {manifest}')
+        return [task_arg_list[i] for i in keep], [run_paths[i] for i in keep]
+
+    def drop_cached_tasks(self, task_arg_list, run_paths, labels, eval_cache):
+        """
+        Remove (unbatched) single point tasks whose result is in the evaluation cache.
+        Returns the remaining tasks and run paths, and {run_path: record} for the removed ones.
+        """
+        from EnsembleFFFit.matensemble.lammps.helpers import get_elements
+        from EnsembleFFFit.matensemble.lammps.single_point import is_single_point, single_point_key
+        cache = EvalCache(eval_cache)
+        single_points = {}
+        keep, cached = [], {}
+        for i, task_arg in enumerate(task_arg_list):
+            inputs = dict(zip(labels, task_arg))
+            inp, struct = inputs.get('in_lammps'), inputs.get('structure')
+            if inp and struct:
+                if inp not in single_points:
+                    single_points[inp] = is_single_point(inp)
+                if single_points[inp]:
+                    key = single_point_key(inputs.get('ffield'), inp, inputs.get('control'), struct, get_elements(struct))
+                    record = cache.get(key)
+                    if record is not None:
+                        cached[run_paths[i]] = record
+                        continue
+            keep.append(i)
+        return [task_arg_list[i] for i in keep], [run_paths[i] for i in keep], cached
 
     def generic_task_command(self, python_file, user_command=''):
         ''' Builds a generic task command for the LAMMPs python interface '''
@@ -549,6 +920,7 @@ class MACEMatEnsemble(MatEnsembleJob):
                 if os.path.isdir(new_run_path) and finished_file is not None:
                     pattern = os.path.join(new_run_path, finished_file)
                     if glob.glob(pattern):
+                        self.n_skipped_finished += 1
                         continue # finished_file pattern already written
                 
                 new_task_arg_list.append(task_arg_list[i]) # Same inputs here
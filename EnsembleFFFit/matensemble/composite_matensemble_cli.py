@@ -0,0 +1,73 @@
+import argparse
+import shlex
+import yaml
+from EnsembleFFFit.matensemble.base import CompositeMatEnsemble, add_report_arguments, report_options
+from EnsembleFFFit.matensemble.lammps.lammps_matensemble_cli import build_parser as lammps_parser
+from EnsembleFFFit.matensemble.lammps.lammps_matensemble_cli import plan_lammps
+from EnsembleFFFit.matensemble.mace.mace_matensemble_cli import build_parser as mace_parser
+from EnsembleFFFit.matensemble.mace.mace_matensemble_cli import plan_mace
+from EnsembleFFFit.matensemble.reaxff.jaxreaxff_matensemble_cli import build_parser as reaxff_parser
+from EnsembleFFFit.matensemble.reaxff.jaxreaxff_matensemble_cli import plan_reaxff
+
+# Component type -> (argument parser builder, planner)
+COMPONENTS = {'lammps': (lammps_parser, plan_lammps),
+              'mace': (mace_parser, plan_mace),
+              'jaxreaxff': (reaxff_parser, plan_reaxff)}
+
+# Settings the composite applies to every component
+SHARED_ARGUMENTS = ['dry_run', 'state_db', 'results_file', 'stage_dir', 'eval_cache']
+
+def main():
+    parser = argparse.ArgumentParser(description="Co-schedule several MatEnsemble workflows in one allocation")
+
+    parser.add_argument("--spec", "-s", help="Path to a .yml file listing the components to co-schedule", required=True)
+    parser.add_argument("--commands_file", "-cf", help="Where to write the component task command lookup", 
+                        default='composite_commands.json')
+    parser.add_argument("--dry_run", "-dry", help="Only print the structures to be run", action='store_true')
+    parser.add_argument("--state_db", "-db", help="Run-state SQLite database shared by all components", default=None)
+    parser.add_argument("--results_file", "-rf", help="Per-batch results file written by drivers that support it", default=None)
+    parser.add_argument("--stage_dir", "-sd", help="Node-local directory drivers that support it stage shared inputs to", default=None)
+    parser.add_argument("--eval_cache", "-ec", help="Evaluation cache directory drivers that support it reuse and extend", default=None)
+    add_report_arguments(parser)
+
+    args = parser.parse_args()
+    run_composite(args)
+
+def load_yaml(yaml_path):
+    with open(yaml_path, 'r') as load_file:
+        yaml_data = yaml.safe_load(load_file)
+    return yaml_data
+
+def run_composite(args):
+    spec = load_yaml(args.spec)
+
+    composite = CompositeMatEnsemble()
+    for i, component in enumerate(spec['components']):
+        if component['type'] not in COMPONENTS:
+            raise ValueError(f"Unknown component type {component['type']}; choose from {list(COMPONENTS.keys())}")
+
+        # Parse the component arguments exactly as its own CLI would
+        build_parser, plan = COMPONENTS[component['type']]
+        component_args = build_parser().parse_args(shlex.split(component.get('args', '')))
+        # The allocation-wide settings replace the component's own, so it is planned with the ones it runs with
+        for name in SHARED_ARGUMENTS:
+            if hasattr(component_args, name):
+                setattr(component_args, name, getattr(args, name))
+        job, run_kwargs = plan(component_args)
+        run_kwargs.pop('state_db', None) # one database, report, results file name and stage directory for the whole allocation
+        run_kwargs.pop('report', None)
+        run_kwargs.pop('results_file', None)
+        run_kwargs.pop('stage_dir', None)
+        run_kwargs.pop('eval_cache', None)
+        composite.add_component(job, label=component.get('label', f"{component['type']}_{i}"), **run_kwargs)
+
+    composite.run(dry_run=True if args.dry_run else False, 
+                  commands_file=args.commands_file,
+                  state_db=args.state_db,
+                  report=report_options(args),
+                  results_file=args.results_file,
+                  stage_dir=args.stage_dir,
+                  eval_cache=args.eval_cache)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+import json
+import os
+import shlex
+import sys
+
+if __name__ == "__main__":
+    # sys.argv[1] is the commands file written by CompositeMatEnsemble.write_commands,
+    # sys.argv[2] the component index, and everything after are the component task arguments
+    commands_file = sys.argv[1]
+    component_index = int(sys.argv[2])
+
+    with open(commands_file) as fh:
+        commands = json.load(fh)
+
+    command = shlex.split(commands[component_index]) + sys.argv[3:]
+    sys.stdout.flush()
+    os.execvp(command[0], command)
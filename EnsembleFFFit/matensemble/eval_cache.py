@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+import numpy as np
+
+# Content-addressed cache of single point evaluations. Active-learning rounds evaluate the
+# same force fields on the same validation and DFT images again and again; a result is
+# stored once under the hash of (model/ffield contents, structure contents, settings) and
+# reused by any later run, whatever directory the files were copied to.
+
+# Environment variable used to hand the cache directory from the planner to the drivers
+CACHE_ENV = 'ENSEMBLEFFFIT_EVAL_CACHE'
+
+def content_hash(path, chunk_size=1 << 22):
+    ''' sha256 of a file's contents, computed once per (path, size, mtime) in this process '''
+    stat = os.stat(path)
+    return _content_hash(os.path.abspath(path), stat.st_size, stat.st_mtime_ns, chunk_size)
+
+@lru_cache(maxsize=4096)
+def _content_hash(path, size, mtime_ns, chunk_size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def eval_key(model, structure, settings_files=(), **settings):
+    """
+    Cache key of evaluating structure with model: the contents of both files, of the
+    settings files (input script, control file, ...) and the remaining settings.
+    """
+    parts = [content_hash(path) if path else '' for path in [model, structure, *settings_files]]
+    parts.append(json.dumps(settings, sort_keys=True, default=str))
+    return hashlib.sha256(':'.join(parts).encode()).hexdigest()
+
+class EvalCache:
+    """
+    Evaluation records (energy, forces, per-atom energies, ... as stored by the drivers
+    in BatchResults) in one .npz file per key under `root`, spread over 256 subdirectories.
+    Writes go through a temporary file, so concurrent tasks can share the cache.
+    """
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.n_hits = 0
+        self.n_misses = 0
+
+    @classmethod
+    def from_env(cls):
+        ''' The cache named by ENSEMBLEFFFIT_EVAL_CACHE, or None when the planner was not given --eval_cache '''
+        root = os.environ.get(CACHE_ENV)
+        return cls(root) if root else None
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], f'{key}.npz')
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        ''' The stored record, or None '''
+        try:
+            with np.load(self.path(key)) as npz:
+                record = {name: npz[name].item() if npz[name].ndim == 0 else npz[name] for name in npz.files}
+        except (FileNotFoundError, OSError, ValueError): # Missing, or left unreadable by a killed writer
+            self.n_misses += 1
+            return None
+        self.n_hits += 1
+        return record
+
+    def put(self, key, record):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp.', suffix='.npz') # Unique per writer
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                np.savez(fh, **{name: np.asarray(value) for name, value in record.items()})
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
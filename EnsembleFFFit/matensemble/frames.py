@@ -0,0 +1,140 @@
+import json
+import os
+import numpy as np
+
+# Append-only binary frame files for MD output. A small header (magic, version, atom count,
+# atomic numbers) is followed by fixed-size records of (step, energy, cell, positions, forces),
+# so each frame is written once and never held in memory, and readers can memory-map the
+# whole run as a numpy structured array.
+
+MAGIC = b'EFFFRAME'
+VERSION = 1
+
+def frame_dtype(natoms):
+    return np.dtype([('step', '<i8'),
+                     ('energy', '<f8'),
+                     ('cell', '<f8', (3, 3)),
+                     ('positions', '<f8', (natoms, 3)),
+                     ('forces', '<f8', (natoms, 3))])
+
+def header_size(natoms):
+    return len(MAGIC) + 16 + 8 * natoms
+
+def read_header(path):
+    ''' The atomic numbers stored in a frame file's header '''
+    with open(path, 'rb') as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a frame file')
+        version, natoms = np.frombuffer(fh.read(16), dtype='<i8')
+        if version != VERSION:
+            raise ValueError(f'{path} has frame file version {version}, expected {VERSION}')
+        return np.frombuffer(fh.read(8 * int(natoms)), dtype='<i8').copy()
+
+def n_complete_frames(path, natoms):
+    ''' Whole frames in the file; a partial frame left by a kill mid-write is not counted '''
+    return max(os.path.getsize(path) - header_size(natoms), 0) // frame_dtype(natoms).itemsize
+
+def read_frames(path, mode='r'):
+    """
+    (atomic numbers, frames) where frames is a memory-mapped structured array with fields
+    step, energy, cell (3x3), positions (natoms x 3) and forces (natoms x 3), e.g.
+    frames['energy'] or frames[frames['step'] == 5000]['forces'].
+    """
+    numbers = read_header(path)
+    natoms = len(numbers)
+    n = n_complete_frames(path, natoms)
+    if n == 0:
+        return numbers, np.zeros(0, dtype=frame_dtype(natoms))
+    return numbers, np.memmap(path, dtype=frame_dtype(natoms), mode=mode, offset=header_size(natoms), shape=(n,))
+
+def frame_atoms(numbers, frame, pbc=True):
+    ''' One frame as an ase Atoms object with its energy and forces attached '''
+    from ase import Atoms
+    from ase.calculators.singlepoint import SinglePointCalculator
+    atoms = Atoms(numbers=numbers, positions=frame['positions'], cell=frame['cell'], pbc=pbc)
+    atoms.calc = SinglePointCalculator(atoms, energy=float(frame['energy']), forces=np.array(frame['forces']))
+    return atoms
+
+def export_frames(path, traj_path=None, properties_path=None, pbc=True):
+    """
+    Write a finished frame file out as an ASE trajectory and as properties.json
+    ({step: {energy, fx, fy, fz}}), for the readers of those files. properties.json is
+    written last, through a temporary file, since its presence marks the run finished.
+    """
+    numbers, frames = read_frames(path)
+    if traj_path is not None:
+        from ase.io.trajectory import Trajectory
+        with Trajectory(traj_path, 'w') as traj:
+            for frame in frames:
+                traj.write(frame_atoms(numbers, frame, pbc=pbc))
+    if properties_path is not None:
+        properties = {int(frame['step']): {'energy': float(frame['energy']),
+                                           'fx': frame['forces'][:, 0].tolist(),
+                                           'fy': frame['forces'][:, 1].tolist(),
+                                           'fz': frame['forces'][:, 2].tolist()}
+                      for frame in frames}
+        with open(f'{properties_path}.tmp', 'w') as fh:
+            json.dump(properties, fh, indent=4)
+        os.replace(f'{properties_path}.tmp', properties_path)
+
+def truncate_frames(path, n_frames):
+    ''' Drop frames after the first n_frames (e.g. those written after the last checkpoint) '''
+    if not os.path.exists(path):
+        return
+    natoms = len(read_header(path))
+    size = header_size(natoms) + n_frames * frame_dtype(natoms).itemsize
+    if os.path.getsize(path) > size:
+        os.truncate(path, size)
+
+class FrameWriter:
+    """
+    Writes one record per frame, flushing every `chunk_frames` frames in one sequential
+    write, so memory use does not grow with the run length. flush() writes the frames held
+    so far (e.g. before a checkpoint refers to them). With append=True an existing file for
+    the same atoms is continued.
+    """
+    def __init__(self, path, numbers, append=False, chunk_frames=1):
+        self.path = path
+        self.numbers = np.asarray(numbers, dtype='<i8')
+        self.dtype = frame_dtype(len(self.numbers))
+        self.chunk_frames = max(int(chunk_frames), 1)
+        self.buffer = []
+        if append and os.path.exists(path):
+            if not np.array_equal(read_header(path), self.numbers):
+                raise ValueError(f'{path} holds frames of different atoms')
+            truncate_frames(path, n_complete_frames(path, len(self.numbers)))
+            self.fh = open(path, 'ab')
+        else:
+            self.fh = open(path, 'wb')
+            self.fh.write(MAGIC)
+            self.fh.write(np.array([VERSION, len(self.numbers)], dtype='<i8').tobytes())
+            self.fh.write(self.numbers.tobytes())
+            self.fh.flush()
+
+    def write(self, step, energy, cell, positions, forces):
+        frame = np.zeros((), dtype=self.dtype)
+        frame['step'] = step
+        frame['energy'] = energy
+        frame['cell'] = cell
+        frame['positions'] = positions
+        frame['forces'] = forces
+        self.buffer.append(frame.tobytes())
+        if len(self.buffer) >= self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.fh.write(b''.join(self.buffer))
+            self.buffer = []
+        self.fh.flush()
+
+    def close(self):
+        if not self.fh.closed:
+            self.flush()
+            self.fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -4,18 +4,23 @@ import subprocess
 import sys
 from glob import glob
 from time import sleep
+from EnsembleFFFit.matensemble.run_state import RunStateDB
 
-def submit_and_get_id(workdir, submission_file):
+def submit_and_get_id(workdir, submission_file, dependency=None):
     """
     Submit with sbatch and parse the JobID from stdout.
+    dependency is passed to sbatch --dependency, e.g. 'afterok:123:124'.
     Returns an integer JobID, or None if submission failed.
     """
     orig_cwd = os.getcwd()
     os.chdir(workdir)
     print(f"Submitting job {os.path.join(workdir, submission_file)}")
+    command = ["sbatch"]
+    if dependency:
+        command += [f"--dependency={dependency}", "--kill-on-invalid-dep=yes"]
     try:
         result = subprocess.run(
-            ["sbatch", submission_file],
+            command + [submission_file],
             check=True,
             capture_output=True,
             text=True
@@ -70,7 +75,7 @@ def check_job(jobid, workdir):
 
 def handling_logic(in_queue, done_flag, fail_flag, all_complete, jobid,
                    workdir, submission_file, resubmit, max_retries, 
-                   retry_count, poll_interval):
+                   retry_count, poll_interval, state_db=None):
     """
     Resubmission or exit logic.
     """
@@ -93,7 +98,8 @@ def handling_logic(in_queue, done_flag, fail_flag, all_complete, jobid,
                     resubmit=True,
                     max_retries=max_retries,
                     retry_count=retry_count+1,
-                    poll_interval=poll_interval
+                    poll_interval=poll_interval,
+                    state_db=state_db
             )
         else:
             print(f"Exiting")
@@ -116,15 +122,37 @@ def clean_directory(directory):
         for fn in glob(os.path.join(directory, pattern)):
             os.remove(fn)
 
+def record_job_status(state_db, jobid, in_queue, done_flag, fail_flag, all_complete):
+    """
+    Mirror the polled job status into the run-state database, if one is used.
+    """
+    if state_db is None:
+        return
+    if all_complete:
+        status = 'complete'
+    elif in_queue:
+        status = 'queued'
+    elif fail_flag:
+        status = 'failed'
+    elif done_flag:
+        status = 'done'
+    else:
+        status = 'left_queue'
+    db = RunStateDB(state_db)
+    db.update_job(jobid, status)
+    db.close()
+
 def MatEnsemble_submission_wrapper(
     workdir,
     submission_file,
     resubmit=False,
     max_retries=3,
     retry_count=0,
-    poll_interval=60):
+    poll_interval=60,
+    state_db=None):
     """
     Submit a SLURM job, monitor its lifecycle, and optionally resubmit.
+    Job IDs and polled states are recorded in state_db (a run-state database path) if given.
     """
     if retry_count > max_retries:
         print("Maximum retries exceeded. Exiting.")
@@ -135,7 +163,7 @@ def MatEnsemble_submission_wrapper(
     in_queue, done_flag, fail_flag, all_complete = check_job(unknown_id, workdir)
     handling_logic(in_queue, done_flag, fail_flag, all_complete, unknown_id, 
                    workdir, submission_file, resubmit, max_retries, 
-                   retry_count, poll_interval)
+                   retry_count, poll_interval, state_db)
     
     # Step 1: cleanup old markers
     clean_directory(workdir)
@@ -143,12 +171,17 @@ def MatEnsemble_submission_wrapper(
     # Step 2: submit and grab JobID
     jobid = submit_and_get_id(workdir, submission_file)
     print(f"Submitted job {jobid}")
+    if state_db is not None and jobid is not None:
+        db = RunStateDB(state_db)
+        db.record_job(jobid, workdir, submission_file)
+        db.close()
 
     # Step 3: poll until job leaves the queue
     run = True
     while run:
         sleep(poll_interval)
         in_queue, done_flag, fail_flag, all_complete = check_job(jobid, workdir)
+        record_job_status(state_db, jobid, in_queue, done_flag, fail_flag, all_complete)
         run = handling_logic(in_queue, done_flag, fail_flag, all_complete, jobid, 
                              workdir, submission_file, resubmit, max_retries, 
-                             retry_count, poll_intervale)
+                             retry_count, poll_interval, state_db)
@@ -0,0 +1,100 @@
+import os
+import time
+import lammps
+
+# Thread-level acceleration for the CPU LAMMPs drivers. The number of threads comes from
+# the cores the task was actually given (Flux/SLURM CPU binding), so a task launched with
+# cpus_per_task > 1 uses them through the OPENMP or KOKKOS (OpenMP backend) packages.
+
+def allocated_threads(threads=None):
+    """
+    Threads for one LAMMPs rank: `threads` if given, otherwise the cores this process is
+    bound to, capped by SLURM_CPUS_PER_TASK and OMP_NUM_THREADS when they are set.
+    Pass --threads explicitly if tasks are not bound to their cores.
+    """
+    if threads:
+        return int(threads)
+    n = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    for var in ['SLURM_CPUS_PER_TASK', 'OMP_NUM_THREADS']:
+        try:
+            n = min(n, int(os.environ[var]))
+        except (KeyError, ValueError):
+            continue
+    return max(n, 1)
+
+def available_accelerators():
+    ''' Thread accelerators supported by the installed LAMMPs library ('omp', 'kokkos') '''
+    probe = lammps.lammps(cmdargs=["-log", "none", "-screen", "none", "-nocite"])
+    config = probe.accelerator_config
+    probe.close()
+    available = []
+    if 'openmp' in config.get('OPENMP', {}).get('api', []):
+        available.append('omp')
+    if 'openmp' in config.get('KOKKOS', {}).get('api', []):
+        available.append('kokkos')
+    return available
+
+def accelerator_cmdargs(accelerator='auto', threads=None):
+    """
+    LAMMPs command line arguments for the accelerator and thread count.
+      - 'auto': OPENMP if there is more than one thread and the package is installed
+      - 'omp': -sf omp -pk omp N
+      - 'kokkos': -k on t N -sf kk (Kokkos built with the OpenMP backend)
+      - 'none': plain styles
+    Returns (cmdargs, accelerator actually used, threads).
+    """
+    threads = allocated_threads(threads)
+    if accelerator == 'none' or (accelerator == 'auto' and threads == 1):
+        return [], 'none', 1
+
+    available = available_accelerators()
+    if accelerator == 'auto':
+        accelerator = 'omp' if 'omp' in available else 'none'
+    elif accelerator not in available:
+        print(f'{accelerator} is not available in this LAMMPs build ({available}); using plain styles')
+        accelerator = 'none'
+
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    if accelerator == 'omp':
+        return ['-sf', 'omp', '-pk', 'omp', str(threads)], accelerator, threads
+    if accelerator == 'kokkos':
+        return ['-k', 'on', 't', str(threads), '-sf', 'kk'], accelerator, threads
+    return [], 'none', 1
+
+def benchmark(inp, variables, threads=None, repeats=3):
+    """
+    Time the input script with plain styles on one thread and with each available
+    accelerator on 1, 2, 4, ... up to `threads` threads, and print the speedup versus serial.
+    `variables` are set as LAMMPs string variables before the script is read.
+    Returns {(accelerator, threads): best wall time in seconds}.
+    """
+    max_threads = allocated_threads(threads)
+    counts = [1]
+    while counts[-1] * 2 <= max_threads:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_threads:
+        counts.append(max_threads)
+
+    configs = [('none', 1)] + [(acc, n) for acc in available_accelerators() for n in counts]
+    timings = {}
+    for accelerator, n in configs:
+        cmdargs, used, n = accelerator_cmdargs(accelerator, n)
+        if (used, n) in timings:
+            continue
+        best = None
+        for _ in range(repeats):
+            lmp = lammps.lammps(cmdargs=["-log", "none", "-screen", "none", "-nocite"] + cmdargs)
+            for name, value in variables.items():
+                lmp.command(f'variable {name} string "{value}"')
+            start = time.perf_counter()
+            lmp.file(inp)
+            elapsed = time.perf_counter() - start
+            lmp.close()
+            best = elapsed if best is None else min(best, elapsed)
+        timings[(used, n)] = best
+
+    serial = timings[('none', 1)]
+    print(f"{'accelerator':>12} {'threads':>8} {'time (s)':>10} {'speedup':>8}")
+    for (accelerator, n), elapsed in timings.items():
+        print(f'{accelerator:>12} {n:>8} {elapsed:>10.3f} {serial / elapsed:>8.2f}')
+    return timings
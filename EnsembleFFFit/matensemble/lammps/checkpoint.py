@@ -0,0 +1,101 @@
+import json
+import os
+import numpy as np
+
+# Checkpoint/resume support for the MD drivers. Checkpoints live in each run's output
+# directory and are removed once the run completes, so a relaunch after a walltime kill
+# continues from the last checkpoint while finished runs start fresh.
+
+# ---------------- LAMMPs ----------------
+def lammps_checkpoint_files(output):
+    ''' The two restart files LAMMPs alternates between, so a kill mid-write leaves one intact '''
+    return [os.path.join(output, 'checkpoint.a.restart'), os.path.join(output, 'checkpoint.b.restart')]
+
+def latest_lammps_checkpoint(output):
+    ''' The most recently written, non-empty restart file in output, or None '''
+    existing = [path for path in lammps_checkpoint_files(output) if os.path.exists(path) and os.path.getsize(path) > 0]
+    return max(existing, key=os.path.getmtime) if existing else None
+
+def set_lammps_checkpoint_variables(lmp, output, checkpoint_every):
+    """
+    Define the variables a resumable input script uses:
+      resume (0/1), restart_file, checkpoint_every, checkpoint_a, checkpoint_b, append (yes/no)
+    e.g. `if "${resume} == 1" then "read_restart ${restart_file}" else "read_data ${structure}"`,
+    `restart ${checkpoint_every} ${checkpoint_a} ${checkpoint_b}`, `run N upto` for each
+    stage and `dump_modify ... append ${append}`.
+    Returns the restart file being resumed from, or None.
+    """
+    restart_file = latest_lammps_checkpoint(output)
+    checkpoint_a, checkpoint_b = lammps_checkpoint_files(output)
+    lmp.command(f"variable resume equal {1 if restart_file else 0}")
+    lmp.command(f"variable restart_file string {restart_file or 'none'}")
+    lmp.command(f"variable checkpoint_every equal {int(checkpoint_every)}")
+    lmp.command(f"variable checkpoint_a string {checkpoint_a}")
+    lmp.command(f"variable checkpoint_b string {checkpoint_b}")
+    lmp.command(f"variable append string {'yes' if restart_file else 'no'}")
+    return restart_file
+
+def clear_lammps_checkpoints(output):
+    for path in lammps_checkpoint_files(output):
+        if os.path.exists(path):
+            os.remove(path)
+
+# ---------------- ASE ----------------
+def ase_checkpoint_file(output):
+    return os.path.join(output, 'checkpoint.json')
+
+def write_ase_checkpoint(output, atoms, step, n_frames, **counters):
+    """
+    Atoms (positions, momenta, cell), the dynamics step, the number of frames written
+    so far and any other counters (e.g. n_uncertain=...), in one atomically replaced JSON file.
+    """
+    checkpoint = {
+        'step': int(step),
+        'n_frames': int(n_frames),
+        'numbers': atoms.get_atomic_numbers().tolist(),
+        'positions': atoms.get_positions().tolist(),
+        'momenta': atoms.get_momenta().tolist(),
+        'cell': np.asarray(atoms.get_cell()).tolist(),
+        'pbc': [bool(p) for p in atoms.get_pbc()],
+        **{name: int(value) for name, value in counters.items()},
+    }
+    path = ase_checkpoint_file(output)
+    with open(f'{path}.tmp', 'w') as fh:
+        json.dump(checkpoint, fh)
+    os.replace(f'{path}.tmp', path)
+
+def read_ase_checkpoint(output):
+    ''' The checkpoint dictionary for output, or None if the run has none '''
+    path = ase_checkpoint_file(output)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+def restore_ase_atoms(atoms, checkpoint):
+    ''' Put the checkpointed positions, momenta and cell back on atoms (same atoms, same order) '''
+    if atoms.get_atomic_numbers().tolist() != checkpoint['numbers']:
+        raise ValueError('Checkpoint atoms do not match the structure')
+    atoms.set_cell(checkpoint['cell'])
+    atoms.set_pbc(checkpoint['pbc'])
+    atoms.set_positions(checkpoint['positions'])
+    atoms.set_momenta(checkpoint['momenta'])
+    return atoms
+
+def truncate_structures(path, n_frames):
+    ''' Keep the first n_frames of an ASE-readable multi-frame file (e.g. extxyz) '''
+    from ase.io import read, write
+    if not os.path.exists(path):
+        return
+    if n_frames == 0:
+        os.remove(path)
+        return
+    frames = read(path, index=':')
+    if len(frames) > n_frames:
+        write(f'{path}.tmp', frames[:n_frames], format='extxyz')
+        os.replace(f'{path}.tmp', path)
+
+def clear_ase_checkpoint(output):
+    path = ase_checkpoint_file(output)
+    if os.path.exists(path):
+        os.remove(path)
@@ -1,79 +1,177 @@
-import sys
+import argparse
 import os
 import torch
 import gc
 from mace.calculators import MACECalculator
 from EnsembleFFFit.matensemble.lammps.helpers import parse_list
-from ase.io import read
-from ase.io import Trajectory
+from EnsembleFFFit.matensemble.run_state import open_from_env, record_task
+from EnsembleFFFit.matensemble.prefetch import Prefetcher, AsyncWriter, exit_on_sigterm
+from EnsembleFFFit.matensemble.staging import stage_lists
+from EnsembleFFFit.matensemble.model_registry import ModelRegistry, load_torch_model
+from EnsembleFFFit.matensemble.lammps.checkpoint import read_ase_checkpoint, write_ase_checkpoint, restore_ase_atoms, clear_ase_checkpoint, truncate_structures
+from EnsembleFFFit.matensemble.frames import FrameWriter, truncate_frames, export_frames
+from EnsembleFFFit.matensemble.precision import add_precision_arguments, validate_fast_mode
+from ase.io import read, write
+from ase.calculators.singlepoint import SinglePointCalculator
 from ase.md.verlet import VelocityVerlet
 from ase.md.velocitydistribution import MaxwellBoltzmannDistribution
 import ase.units as units
 import json
+import numpy as np
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a batch of ASE MD with MACE models")
+    parser.add_argument("--checkpoint_every", "-ce", type=int, help="MD steps between checkpoints (0 disables); a relaunched run resumes from the last one", default=10000)
+    parser.add_argument("--max_models", "-mm", type=int, help="Loaded models kept in memory for reuse across the batch's structures", default=2)
+    parser.add_argument("--committee", "-cm", help="Model paths of a committee evaluated during the MD; frames it disagrees on are saved to uncertain.xyz", default=None)
+    parser.add_argument("--uncertainty_every", "-ue", type=int, help="MD steps between committee evaluations", default=100)
+    parser.add_argument("--force_threshold", "-ft", type=float, help="Largest per-atom committee force standard deviation (eV/A) above which a frame is saved", default=0.2)
+    parser.add_argument("--max_uncertain", "-mu", type=int, help="Stop a run once this many uncertain frames are saved (0 runs every step)", default=20)
+    parser.add_argument("--frames_per_write", "-fw", type=int, help="Frames held in memory and written to md_run.frames together", default=10)
+    add_precision_arguments(parser)
+    parser.add_argument("task_lists", nargs=4, help="Force field, input, structure and output path lists")
+    args = parser.parse_args()
 
-    ff_list       = parse_list(sys.argv[1]) # Force field file paths
-    input_list    = parse_list(sys.argv[2]) # Input file paths
-    struct_list   = parse_list(sys.argv[3]) # Structure file paths
-    output_list   = parse_list(sys.argv[4]) # LAMMPs output write paths
+    ff_list       = parse_list(args.task_lists[0]) # Force field file paths
+    input_list    = parse_list(args.task_lists[1]) # Input file paths
+    struct_list   = parse_list(args.task_lists[2]) # Structure file paths
+    output_list   = parse_list(args.task_lists[3]) # LAMMPs output write paths
 
     n = len(ff_list)
     assert all(len(lst) == n for lst in (input_list, struct_list, output_list)), "All lists must be same length"
+    ff_list = stage_lists(ff_list)[0] # Node-local copies of the models if the planner was given --stage_dir
+    state_db = open_from_env() # Report progress if the planner was given --state_db
 
-    for idx, (ff, inp, struct, output) in enumerate(zip(ff_list, input_list, struct_list, output_list), start=0):
-        
-        # 1a) Load the MACE model
-        calculator = MACECalculator(model_path=ff, device="cuda" if torch.cuda.is_available() else "cpu")
+    def prefetch(idx):
+        ''' Read structure idx and its settings on the prefetch thread while the previous MD runs '''
+        with open(input_list[idx]) as fh:
+            cfg = json.load(fh)
+        return read(struct_list[idx]), cfg
 
-        # 1b) Load the structure file
-        init_conf = read(struct)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    def make_calculator(path, precision='float64', compile=False):
+        ''' A calculator with its own copy of the model (MACECalculator converts the model's dtype in place) '''
+        return MACECalculator(models=load_torch_model(path, device), device=device,
+                              default_dtype=precision, compile_mode='default' if compile else None)
 
-        # 2) Initialize the calculation
-        init_conf.set_calculator(calculator)
-        with open(inp) as fh: 
-            cfg = json.load(fh)
-        MaxwellBoltzmannDistribution(init_conf, temperature_K=cfg['temperature'])
-
-        # --- MD integrator
-        dt = 1.0 * units.fs
-        dyn = VelocityVerlet(init_conf, dt)
-
-        # 3) Run the MD and update the status of property_dictionary
-        property_dict = {}
-
-        def update_status():
-            step = dyn.get_number_of_steps()
-            energy = init_conf.get_potential_energy()
-            forces = init_conf.get_forces()
-            property_dictionary = {
-                'energy': float(energy),
-                'fx': [float(f[0]) for f in forces],
-                'fy': [float(f[1]) for f in forces],
-                'fz': [float(f[2]) for f in forces],
-            }
-            property_dict[step] = property_dictionary
-
-        # attach the callback to run every 1000 steps
-        dyn.attach(update_status, 1000)
-
-        # --- trajectory and attachments
-        traj = Trajectory(os.path.join(output, 'md_run.traj'), 'w', init_conf)
-        dyn.attach(traj.write, 1000, init_conf)
-
-        # Run the MD
-        dyn.run(cfg['nsteps'])
-
-        # close trajectory file
-        traj.close()
-
-        # --- after run: write the property_dict to disk once ---
-        output_name = os.path.join(output, 'properties.json')
-        with open(output_name, "w") as f:
-            json.dump(property_dict, f, indent=4)
-
-        # --- after run: free Python memory ---
-        if torch.cuda.is_available():
-            del calculator, init_conf, dyn  # remove large objects
-            gc.collect()                # free Python memory
-            torch.cuda.empty_cache()    # release unreferenced GPU memory back to CUDA driver
+    fast_modes = {}
+    def fast_mode(path):
+        ''' The requested --precision/--compile if it matches float64 on this model's structures, else float64 '''
+        if path not in fast_modes:
+            sample = [read(struct_list[idx]) for idx in range(n) if ff_list[idx] == path][:args.validate_structures]
+            fast_modes[path] = validate_fast_mode(lambda precision, compile: make_calculator(path, precision, compile), sample,
+                                                  args.precision, args.compile, args.energy_tol, args.force_tol)
+        return fast_modes[path]
+
+    # Each model is loaded once (memory-mapped) and its calculator reused by every structure that uses it
+    calculators = ModelRegistry(lambda path: make_calculator(path, *fast_mode(path)), max_models=args.max_models)
+
+    # One calculator for the whole committee: each structure's graph is built once for all members.
+    # It stays in float64, since its force spread is compared against --force_threshold
+    committee = None
+    if args.committee:
+        committee = MACECalculator(models=[load_torch_model(path, device) for path in stage_lists(parse_list(args.committee))[0]],
+                                   device=device, default_dtype='float64')
+
+    writer = AsyncWriter(max_pending=4) # Frames and checkpoints are written while the MD continues
+    exit_on_sigterm() # A scheduler kill still writes the queued frames
+    for idx, prefetched in Prefetcher(prefetch, range(n), depth=2):
+        ff, inp, struct, output = ff_list[idx], input_list[idx], struct_list[idx], output_list[idx]
+        with record_task(state_db, output):
+            # 1a) Get the MACE calculator, loading the model only if it is not already in memory
+            calculator = calculators.get(ff)
+
+            # 1b) Load the structure file (read ahead of time by the prefetch thread)
+            init_conf, cfg = prefetched.get()
+
+            # 2) Initialize the calculation, or continue from the checkpoint of a killed launch
+            init_conf.set_calculator(calculator)
+            checkpoint = read_ase_checkpoint(output)
+            if checkpoint is None:
+                MaxwellBoltzmannDistribution(init_conf, temperature_K=cfg['temperature'])
+                start = 0
+            else:
+                restore_ase_atoms(init_conf, checkpoint)
+                start = checkpoint['step']
+
+            # --- MD integrator
+            dt = 1.0 * units.fs
+            dyn = VelocityVerlet(init_conf, dt)
+            dyn.nsteps = start # Step numbers (and the observer intervals) continue from the checkpoint
+
+            # 3) Stream every 1000th step's positions, cell, energy and forces to one binary frame file;
+            #    a resumed run appends after the checkpointed frames
+            frames_path = os.path.join(output, 'md_run.frames')
+            if checkpoint is None:
+                if os.path.exists(os.path.join(output, 'properties.json')): # Not finished again until this run is
+                    os.remove(os.path.join(output, 'properties.json'))
+                frames, n_frames = FrameWriter(frames_path, init_conf.get_atomic_numbers(), chunk_frames=args.frames_per_write), [0]
+            else:
+                truncate_frames(frames_path, checkpoint['n_frames'])
+                frames, n_frames = FrameWriter(frames_path, init_conf.get_atomic_numbers(), append=True,
+                                               chunk_frames=args.frames_per_write), [checkpoint['n_frames']]
+
+            def write_frame():
+                step = dyn.get_number_of_steps()
+                if checkpoint is not None and step == start:
+                    return # Already written before the checkpoint
+                # Copies of this step's values are written in the background while the MD continues
+                writer.submit(frames.write, step, init_conf.get_potential_energy(), np.array(init_conf.get_cell()),
+                              init_conf.get_positions(), init_conf.get_forces())
+                n_frames[0] += 1
+            dyn.attach(write_frame, 1000)
+
+            # --- committee disagreement: save the frames the committee disagrees on (with its mean energy and forces)
+            uncertain_path = os.path.join(output, 'uncertain.xyz')
+            n_uncertain = [checkpoint.get('n_uncertain', 0) if checkpoint is not None else 0]
+            if committee is not None:
+                truncate_structures(uncertain_path, n_uncertain[0])
+
+                def check_disagreement():
+                    step = dyn.get_number_of_steps()
+                    if checkpoint is not None and step == start:
+                        return # Already checked before the checkpoint
+                    snapshot = init_conf.copy()
+                    snapshot.calc = committee
+                    snapshot.get_forces()
+                    force_std = float(np.sqrt(committee.results['forces_var'].sum(axis=1)).max())
+                    if force_std > args.force_threshold:
+                        snapshot.info.update(step=step, force_std=force_std)
+                        snapshot.calc = SinglePointCalculator(snapshot, energy=committee.results['energy'],
+                                                              forces=committee.results['forces'])
+                        writer.submit(write, uncertain_path, snapshot, format='extxyz', append=True)
+                        n_uncertain[0] += 1
+                dyn.attach(check_disagreement, args.uncertainty_every)
+
+            # --- periodic checkpoint, after this step's frame; queued behind it (and a flush of the
+            #     held frames) so the two stay consistent
+            def write_checkpoint():
+                writer.submit(frames.flush)
+                writer.submit(write_ase_checkpoint, output, init_conf.copy(), dyn.get_number_of_steps(),
+                              n_frames[0], n_uncertain=n_uncertain[0])
+            if args.checkpoint_every > 0:
+                dyn.attach(write_checkpoint, args.checkpoint_every)
+
+            # Run the remaining MD steps; with a committee, stop once enough uncertain frames are saved
+            try:
+                for _ in dyn.irun(cfg['nsteps'] - start):
+                    if committee is not None and args.max_uncertain and n_uncertain[0] >= args.max_uncertain:
+                        print(f'{output}: stopping at step {dyn.get_number_of_steps()} with {n_uncertain[0]} uncertain frames')
+                        break
+            finally:
+                # --- after run (or a kill): close the frame file once its last frames are written ---
+                writer.submit(frames.close)
+
+            # --- after run: also write md_run.traj and properties.json (the run's completion marker) from the frames
+            writer.submit(export_frames, frames_path, os.path.join(output, 'md_run.traj'),
+                          os.path.join(output, 'properties.json'), pbc=init_conf.get_pbc())
+            writer.submit(clear_ase_checkpoint, output) # The run finished; a relaunch starts it from scratch
+
+            # --- after run: free Python memory (the calculator stays loaded in the registry) ---
+            if torch.cuda.is_available():
+                del init_conf, dyn  # remove large objects
+                gc.collect()                # free Python memory
+                torch.cuda.empty_cache()    # release unreferenced GPU memory back to CUDA driver
+
+    # Wait for the last outputs to be written
+    writer.close()
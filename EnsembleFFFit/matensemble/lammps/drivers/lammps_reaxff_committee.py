@@ -0,0 +1,93 @@
+import lammps
+import argparse
+import os
+import numpy as np
+from EnsembleFFFit.matensemble.lammps.helpers import parse_list
+from EnsembleFFFit.matensemble.lammps.helpers import get_elements
+from EnsembleFFFit.matensemble.lammps.single_point import read_script_commands, force_field_commands
+from EnsembleFFFit.matensemble.lammps.accelerator import accelerator_cmdargs
+from EnsembleFFFit.matensemble.run_state import open_from_env, record_task
+from EnsembleFFFit.matensemble.results import save_npz
+from EnsembleFFFit.matensemble.staging import stage_file, stage_lists
+
+# Commands of the set up script that are not needed to rerun a trajectory
+SKIP_COMMANDS = ['run', 'minimize', 'dump', 'dump_modify', 'undump', 'write_data', 'write_restart', 'write_dump']
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a committee of ReaxFF force fields on one trajectory with rerun")
+    parser.add_argument("--rerun_fields", "-rrf", help="Fields read from each dump frame by rerun", default='x y z box yes')
+    parser.add_argument("--accelerator", "-acc", choices=['auto', 'omp', 'kokkos', 'none'], help="Thread accelerator package", default='auto')
+    parser.add_argument("--threads", "-t", type=int, help="Threads per rank (default: the cores the task is bound to)", default=None)
+    parser.add_argument("ffields", help="Force field file paths of the committee")
+    parser.add_argument("control", help="Control file path")
+    parser.add_argument("input", help="Input script that sets up the system: read_data ${structure}, pair_style/pair_coeff with ${ff_filename} and the QEq fix")
+    parser.add_argument("structure", help="LAMMPs data file with the trajectory's atom IDs, types and masses")
+    parser.add_argument("trajectory", help="Multi-frame LAMMPs dump file to rerun")
+    parser.add_argument("output", help="Results .npz file")
+    args = parser.parse_args()
+
+    ff_list = stage_lists(parse_list(args.ffields))[0] # Force field file paths (node-local copies with --stage_dir)
+    args.control, args.input = stage_file(args.control), stage_file(args.input)
+    output_dir = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(output_dir, exist_ok=True)
+
+    accelerator_args, _, _ = accelerator_cmdargs(args.accelerator, args.threads)
+    lmp = lammps.lammps(cmdargs=["-log", "none", "-screen", "os.devnull"] + accelerator_args)
+    state_db = open_from_env() # Report progress if the planner was given --state_db
+
+    with record_task(state_db, output_dir):
+        # 1a) Open a log file next to the results
+        lmp.command(f"log {os.path.join(output_dir, 'log.committee.lammps')}")
+
+        # 1b) Pass in your filenames
+        elements = get_elements(args.structure)
+        lmp.command(f"variable ff_filename string {ff_list[0]}")
+        lmp.command(f"variable control_filename string {args.control}")
+        lmp.command(f"variable structure string {args.structure}")
+        lmp.command(f'variable elements string "{elements}"')
+
+        # 2) Set up the system once, without the script's runs and dumps
+        commands = read_script_commands(args.input)
+        for cmd in commands:
+            if cmd.split()[0] not in SKIP_COMMANDS:
+                lmp.command(cmd)
+        ff_commands = force_field_commands(commands)
+
+        # 3) Capture the energy, forces and positions of every frame after the forces are computed
+        frames = []
+        def capture(caller, step, nlocal, tag, x, fexternal):
+            energy = lmp.extract_compute('thermo_pe', lammps.LMP_STYLE_GLOBAL, lammps.LMP_TYPE_SCALAR)
+            forces = np.array(lmp.gather_atoms('f', 1, 3)).reshape(-1, 3)
+            frames.append((step, energy, forces))
+        lmp.command("fix committee_capture all external pf/callback 1 1")
+        lmp.set_fix_external_callback('committee_capture', capture, None)
+
+        # 4) Rerun the trajectory with each committee member
+        energies, forces, timesteps = [], [], None
+        for ff in ff_list:
+            frames.clear()
+            lmp.command(f"variable ff_filename string {ff}")
+            for cmd in ff_commands:
+                lmp.command(cmd)
+            lmp.command(f"rerun {args.trajectory} dump {args.rerun_fields}")
+
+            steps = [step for step, _, _ in frames]
+            if timesteps is None:
+                timesteps = steps
+            elif steps != timesteps:
+                raise ValueError(f'{ff} saw frames {steps}, expected {timesteps}')
+            energies.append([energy for _, energy, _ in frames])
+            forces.append([f for _, _, f in frames])
+
+        # 5) Write every committee member's per-frame energies and forces to one file
+        save_npz(args.output,
+                 ffields=np.array(ff_list),
+                 timesteps=np.array(timesteps),
+                 energy=np.array(energies),                 # (n_ffields, n_frames)
+                 forces=np.array(forces),                   # (n_ffields, n_frames, n_atoms, 3)
+                 types=np.array(lmp.gather_atoms('type', 0, 1)),
+                 elements=np.array(elements),
+                 units=np.array(lmp.extract_global('units')))
+
+    # Final cleanup
+    lmp.close()
@@ -0,0 +1,87 @@
+import argparse
+import os
+import numpy as np
+import torch
+from ase.io import read
+from mace import data as mace_data
+from mace.tools import torch_geometric, utils
+from EnsembleFFFit.matensemble.lammps.helpers import parse_list
+from EnsembleFFFit.matensemble.model_registry import load_torch_model
+from EnsembleFFFit.matensemble.staging import stage_lists
+from EnsembleFFFit.matensemble.run_state import open_from_env, record_task
+from EnsembleFFFit.matensemble.results import save_npz
+
+def committee_settings(models, head=None):
+    ''' Cutoff, atomic number table and heads shared by every committee member '''
+    r_maxs = {float(model.r_max) for model in models}
+    if len(r_maxs) != 1:
+        raise ValueError(f'Committee models have different cutoffs {sorted(r_maxs)}')
+    atomic_numbers = {tuple(int(z) for z in model.atomic_numbers) for model in models}
+    if len(atomic_numbers) != 1:
+        raise ValueError('Committee models were trained on different elements')
+    heads = list(getattr(models[0], 'heads', ['Default']))
+    if head is None:
+        head = heads[0] if len(heads) == 1 else next((h for h in heads if h.lower() == 'default'), heads[-1])
+    return r_maxs.pop(), utils.AtomicNumberTable(list(atomic_numbers.pop())), heads, head
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a committee of MACE models on a set of structures")
+    parser.add_argument("--batch_size", "-bs", type=int, help="Structures per forward pass", default=8)
+    parser.add_argument("--device", "-d", help="Torch device", default='cpu')
+    parser.add_argument("--head", help="Model head (default: the only head, or 'default')", default=None)
+    parser.add_argument("models", help="MACE model file paths of the committee")
+    parser.add_argument("structures", help="Structure file paths (any format ase.io.read understands)")
+    parser.add_argument("output", help="Results .npz file")
+    args = parser.parse_args()
+
+    model_list = parse_list(args.models) # Model file paths
+    struct_list = parse_list(args.structures)
+    output_dir = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(output_dir, exist_ok=True)
+    state_db = open_from_env() # Report progress if the planner was given --state_db
+
+    with record_task(state_db, output_dir):
+        # 1a) Load every committee member; the data is built in the first model's precision
+        models = [load_torch_model(path, args.device) for path in stage_lists(model_list)[0]] # Node-local copies with --stage_dir
+        dtype = next(models[0].parameters()).dtype
+        for model in models:
+            model.to(dtype=dtype).eval()
+        r_max, z_table, heads, head = committee_settings(models, args.head)
+
+        # 1b) Build each structure's graph (neighbor list) once; every model reuses it
+        structures = [read(struct) for struct in struct_list]
+        torch.set_default_dtype(dtype)
+        graphs = [mace_data.AtomicData.from_config(mace_data.config_from_atoms(atoms, head_name=head),
+                                                   z_table=z_table, cutoff=r_max, heads=heads)
+                  for atoms in structures]
+        loader = torch_geometric.dataloader.DataLoader(graphs, batch_size=args.batch_size, shuffle=False, drop_last=False)
+
+        # 2) Run all committee members over each batch of structures
+        natoms = np.array([len(atoms) for atoms in structures])
+        n_models, n_structs, max_atoms = len(models), len(structures), int(natoms.max())
+        energies = np.full((n_models, n_structs), np.nan)
+        forces = np.full((n_models, n_structs, max_atoms, 3), np.nan) # Padded with NaN past each structure's atoms
+        start = 0
+        for batch in loader:
+            batch = batch.to(args.device)
+            ptr = batch.ptr.cpu().numpy()
+            for k, model in enumerate(models):
+                out = model(batch.clone().to_dict(), compute_stress=False, training=False)
+                energies[k, start:start + batch.num_graphs] = out['energy'].detach().cpu().numpy()
+                f = out['forces'].detach().cpu().numpy()
+                for g in range(batch.num_graphs):
+                    forces[k, start + g, :ptr[g + 1] - ptr[g]] = f[ptr[g]:ptr[g + 1]]
+            start += batch.num_graphs
+
+        # 3) Write every committee member's energies and forces to one file
+        numbers = np.zeros((n_structs, max_atoms), dtype=int)
+        for i, atoms in enumerate(structures):
+            numbers[i, :len(atoms)] = atoms.get_atomic_numbers()
+        save_npz(args.output,
+                 models=np.array(model_list),
+                 structures=np.array(struct_list),
+                 energy=energies,      # (n_models, n_structures)
+                 forces=forces,        # (n_models, n_structures, max_atoms, 3)
+                 natoms=natoms,
+                 numbers=numbers,
+                 units=np.array('eV'))
@@ -1,56 +1,111 @@
-import sys
+import argparse
 import os
 import torch
 import gc
+from contextlib import ExitStack
 from torch_sim.models.mace import MaceModel
+from mace.calculators import MACECalculator
 from torch_sim import static, integrate
 from torch_sim.integrators import nvt_langevin
 from EnsembleFFFit.matensemble.lammps.helpers import parse_list
 from EnsembleFFFit.matensemble.lammps.helpers import make_prop_calculators
+from EnsembleFFFit.matensemble.lammps.partition import budget_batches
+from EnsembleFFFit.matensemble.lammps.reporter import WriteBehindReporter
+from EnsembleFFFit.matensemble.run_state import open_from_env, record_task
+from EnsembleFFFit.matensemble.prefetch import AsyncWriter, exit_on_sigterm
+from EnsembleFFFit.matensemble.staging import stage_lists
+from EnsembleFFFit.matensemble.model_registry import ModelRegistry, load_torch_model
+from EnsembleFFFit.matensemble.precision import add_precision_arguments, validate_fast_mode
 from ase.io import read
 import json
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a batch of TorchSim MD with MACE models")
+    parser.add_argument("--max_atoms", "-ma", type=int, help="Atoms integrated at once; larger groups are split into sub-batches run back to back (0: no limit)", default=20000)
+    parser.add_argument("--max_models", "-mm", type=int, help="Loaded models kept in memory for reuse across the batch's groups", default=2)
+    parser.add_argument("--frames_per_write", "-fw", type=int, help="Reported frames held in memory and written to each md_run.h5md together", default=10)
+    add_precision_arguments(parser, compile=False)
+    parser.add_argument("task_lists", nargs=4, help="Force field, input, structure and output path lists")
+    args = parser.parse_args()
 
-    ff_list       = parse_list(sys.argv[1]) # Force field file paths
-    input_list    = parse_list(sys.argv[2]) # Input file paths
-    struct_list   = parse_list(sys.argv[3]) # Structure file paths
-    output_list   = parse_list(sys.argv[4]) # TorchSim output write paths
+    ff_list       = parse_list(args.task_lists[0]) # Force field file paths
+    input_list    = parse_list(args.task_lists[1]) # Input file paths
+    struct_list   = parse_list(args.task_lists[2]) # Structure file paths
+    output_list   = parse_list(args.task_lists[3]) # TorchSim output write paths
 
     n = len(ff_list)
-    assert all(x == ff_list[0] for x in ff_list), "Not all force fields are the same for each batch"
-    assert all(x == input_list[0] for x in input_list), "Not all inputs are the same for each batch"
     assert all(len(lst) == n for lst in (input_list, struct_list, output_list)), "All lists must be same length"
+    ff_list = stage_lists(ff_list)[0] # Node-local copies of the models if the planner was given --stage_dir
 
-    # 1a) Load the MACE model
-    model = torch.load(ff_list[0], map_location="cuda" if torch.cuda.is_available() else "cpu")
-    mace_model = MaceModel(model=model) #, device=torch.device("cuda" if torch.cuda.is_available() else "cpu"))
-
-    # 1b) Read the atoms objects and configuration dictionary
+    # 1a) Read the atoms objects; the sub-batches are planned from all of their atom counts
     init_confs = [read(struct) for struct in struct_list]
-    trajectory_files = [os.path.join(output, f"md_run.h5md") for i, output in enumerate(output_list)]
-    with open(input_list[0]) as fh:
-        cfg = json.load(fh)
-
-    # 3) Run the MD
-    mapping = {'potential_energy': cfg['frequency'], 
-               'kinetic_energy': cfg['frequency'], 
-               'forces': cfg['frequency']}
-
-    prop_calculators = make_prop_calculators(mapping, debug=False)
-    
-    final_state = integrate(system=init_confs,
-                            model=mace_model,
-                            n_steps=cfg['nsteps'],
-                            timestep=cfg['timestep'], # in Metal units
-                            temperature=cfg['temperature'],
-                            integrator=nvt_langevin,
-                            trajectory_reporter=dict(filenames=trajectory_files,
-                                                     state_frequency=cfg['frequency'],  # snapshot write-out
-                                                     prop_calculators=prop_calculators))
-
-    # --- after run: free Python memory ---
-    if torch.cuda.is_available():
-        del mace_model, final_state  # remove large objects
-        gc.collect()                # free Python memory
-        torch.cuda.empty_cache()    # release unreferenced GPU memory back to CUDA driver
+
+    # 1b) Report progress if the planner was given --state_db
+    state_db = open_from_env()
+
+    # 1c) float32 is used for a force field only if it matches float64 on some of its structures
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    precisions = {}
+    def precision(path):
+        if path not in precisions:
+            sample = [init_confs[idx] for idx in range(n) if ff_list[idx] == path][:args.validate_structures]
+            precisions[path], _ = validate_fast_mode(lambda precision, compile: MACECalculator(models=load_torch_model(path, device), device=device, default_dtype=precision),
+                                                     sample, args.precision, False, args.energy_tol, args.force_tol)
+        return precisions[path]
+
+    # 1d) Models are loaded (memory-mapped) once per force field
+    models = ModelRegistry(lambda path: MaceModel(model=load_torch_model(path, device), dtype=getattr(torch, precision(path))),
+                           max_models=args.max_models)
+
+    # 2) Group the batch by (force field, input); structures of a group are integrated together
+    groups = {}
+    for idx in range(n):
+        groups.setdefault((ff_list[idx], input_list[idx]), []).append(idx)
+
+    writer = AsyncWriter(max_pending=16) # Trajectory writes run while the integration continues
+    exit_on_sigterm() # A scheduler kill still writes the held and queued frames
+
+    for (ff, inp), group in groups.items():
+        mace_model = models.get(ff)
+        with open(inp) as fh:
+            cfg = json.load(fh)
+
+        mapping = {'potential_energy': cfg['frequency'],
+                   'kinetic_energy': cfg['frequency'],
+                   'forces': cfg['frequency']}
+        prop_calculators = make_prop_calculators(mapping)
+
+        # 3) Run the MD in sub-batches that fit the atom budget, one after another
+        for sub_batch in budget_batches([len(init_confs[idx]) for idx in group], args.max_atoms):
+            indices = [group[i] for i in sub_batch]
+            with ExitStack() as stack: # Every run path of the sub-batch starts and finishes at once
+                for idx in indices:
+                    stack.enter_context(record_task(state_db, output_list[idx]))
+
+                reporter = WriteBehindReporter([os.path.join(output_list[idx], "md_run.h5md") for idx in indices], writer,
+                                               state_frequency=cfg['frequency'],  # snapshot write-out
+                                               chunk_frames=args.frames_per_write,
+                                               prop_calculators=prop_calculators)
+                try:
+                    final_state = integrate(system=[init_confs[idx] for idx in indices],
+                                            model=mace_model,
+                                            n_steps=cfg['nsteps'],
+                                            timestep=cfg['timestep'], # in Metal units
+                                            temperature=cfg['temperature'],
+                                            integrator=nvt_langevin,
+                                            trajectory_reporter=reporter)
+                finally:
+                    reporter.finish() # Queue the held frames (integrate also does this when it completes)
+
+                # The sub-batch is done once its files are written; the next reporter opens new files after this
+                writer.flush()
+
+            # --- after each sub-batch: free the integrator state before the next one ---
+            if torch.cuda.is_available():
+                del final_state             # remove large objects
+                gc.collect()                # free Python memory
+                torch.cuda.empty_cache()    # release unreferenced GPU memory back to CUDA driver
+
+    # --- after run: free the models ---
+    models.clear()
+    writer.close()
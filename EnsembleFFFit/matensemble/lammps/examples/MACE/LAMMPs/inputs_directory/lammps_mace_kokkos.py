@@ -5,6 +5,11 @@ import sys
 import os
 from EnsembleFFFit.matensemble.lammps.helpers import parse_list
 from EnsembleFFFit.matensemble.lammps.helpers import get_elements
+from EnsembleFFFit.matensemble.run_state import open_from_env, record_task
+from EnsembleFFFit.matensemble.results import BatchResults, extract_lammps_results
+from EnsembleFFFit.matensemble.staging import stage_lists
+from EnsembleFFFit.matensemble.eval_cache import EvalCache
+from EnsembleFFFit.matensemble.lammps.single_point import is_single_point, single_point_key
 
 if __name__ == "__main__":
     ff_list       = parse_list(sys.argv[1]) # Force field file paths
@@ -15,34 +20,55 @@ if __name__ == "__main__":
     n = len(ff_list)
     assert all(len(lst) == n for lst in (input_list, struct_list, output_list)), "All lists must be same length"
 
+    # Read the model and input scripts from node-local copies if the planner was given --stage_dir
+    ff_list, input_list = stage_lists(ff_list, input_list)
+
     lmp = lammps.lammps(cmdargs=['-k', 'on', 'g', '4', '-sf', 'kk', 
                       '-pk', 'kokkos', 'neigh', 'half', 
                       'newton', 'off', '-echo', 'both', 
                       "-log", "none", "-screen", "os.devnull"])
     lammps.mliap.activate_mliappy_kokkos(lmp)
+    state_db = open_from_env() # Report progress if the planner was given --state_db
+    results = BatchResults.from_env(output_list) # Write energies/forces to one file if the planner was given --results_file
+    cache = EvalCache.from_env() if results is not None else None # Reuse cached single points if the planner was given --eval_cache
+    single_points = {inp: is_single_point(inp) for inp in set(input_list)} if cache is not None else {}
 
     for idx, (ff, inp, struct, output) in enumerate(zip(ff_list, input_list, struct_list, output_list), start=0):
-        # 1a) Open a new log file in the output path
-        lmp.command(f"log {os.path.join(output, 'log.lammps')}")
+        with record_task(state_db, output):
+            # 1a) Open a new log file in the output path
+            lmp.command(f"log {os.path.join(output, 'log.lammps')}")
+
+            # lb) Set the lammps dumpfile name
+            lmp.command(f"variable dump_file string {os.path.join(output, 'dump_*.dump')}")
 
-        # lb) Set the lammps dumpfile name
-        lmp.command(f"variable dump_file string {os.path.join(output, 'dump_*.dump')}")
+            # 2) Pass in your filenames
+            if ff:
+                lmp.command(f"variable ff_filename string {ff}")
+            if struct:
+                lmp.command(f"variable structure string {struct}")
 
-        # 2) Pass in your filenames
-        if ff:
-            lmp.command(f"variable ff_filename string {ff}")
-        if struct:
-            lmp.command(f"variable structure string {struct}")
+            # 3) Determine the pair coefficient
+            elements = get_elements(struct)
+            lmp.command(f'variable elements string "{elements}"')
 
-        # 3) Determine the pair coefficient
-        elements = get_elements(struct)
-        lmp.command(f'variable elements string "{elements}"')
+            # 4) Run the LAMMPS input, unless the single point is in the evaluation cache
+            key = single_point_key(ff, inp, None, struct, elements) if single_points.get(inp) else None
+            record = cache.get(key) if key is not None else None
+            if record is None:
+                lmp.file(inp)
+                if results is not None:
+                    record = extract_lammps_results(lmp, elements)
+                if key is not None:
+                    cache.put(key, record)
 
-        # 4) Run the LAMMPS input
-        lmp.file(inp)
+            # 5) Keep the results in memory for the batch results file
+            if results is not None:
+                results.add(output, record)
 
-        # 5) Clear for the next iteration
-        lmp.command("clear")
+            # 6) Clear for the next iteration
+            lmp.command("clear")
 
     # Final cleanup
+    if results is not None:
+        results.write()
     lmp.close()
@@ -1,45 +1,125 @@
 import lammps
-import sys
+import argparse
 import os
+import tempfile
 from EnsembleFFFit.matensemble.lammps.helpers import parse_list
 from EnsembleFFFit.matensemble.lammps.helpers import get_elements
+from EnsembleFFFit.matensemble.lammps.helpers import read_natoms
+from EnsembleFFFit.matensemble.lammps.partition import split_partitions, partition_share, is_root
+from EnsembleFFFit.matensemble.lammps.accelerator import accelerator_cmdargs, benchmark
+from EnsembleFFFit.matensemble.lammps.single_point import SinglePointRunner, read_lammps_data, is_single_point, single_point_key
+from EnsembleFFFit.matensemble.lammps.checkpoint import set_lammps_checkpoint_variables, clear_lammps_checkpoints
+from EnsembleFFFit.matensemble.prefetch import Prefetcher
+from EnsembleFFFit.matensemble.staging import stage_lists
+from EnsembleFFFit.matensemble.run_state import open_from_env, record_task
+from EnsembleFFFit.matensemble.results import BatchResults, extract_lammps_results
+from EnsembleFFFit.matensemble.eval_cache import EvalCache
 
 if __name__ == "__main__":
-    ff_list       = parse_list(sys.argv[1]) # Force field file paths
-    control_list  = parse_list(sys.argv[2]) # Control file paths
-    input_list    = parse_list(sys.argv[3]) # Input file paths
-    struct_list   = parse_list(sys.argv[4]) # Structure file paths
-    output_list   = parse_list(sys.argv[5]) # LAMMPs output write paths
+    parser = argparse.ArgumentParser(description="Run a batch of LAMMPs ReaxFF calculations")
+    parser.add_argument("--partition_size", "-ps", type=int, help="MPI ranks per LAMMPs instance; the structures are spread over the partitions", default=None)
+    parser.add_argument("--accelerator", "-acc", choices=['auto', 'omp', 'kokkos', 'none'], help="Thread accelerator package; 'auto' uses OPENMP when the task has more than one core", default='auto')
+    parser.add_argument("--threads", "-t", type=int, help="Threads per rank (default: the cores the task is bound to)", default=None)
+    parser.add_argument("--checkpoint_every", "-ce", type=int, help="Steps between restart checkpoints of MD inputs (0 disables); a relaunched run resumes from the last one", default=10000)
+    parser.add_argument("--benchmark", "-b", action='store_true', help="Time the first structure serially and with each accelerator/thread count, then exit")
+    parser.add_argument("task_lists", nargs=5, help="Force field, control, input, structure and output path lists")
+    args = parser.parse_args()
+
+    ff_list       = parse_list(args.task_lists[0]) # Force field file paths
+    control_list  = parse_list(args.task_lists[1]) # Control file paths
+    input_list    = parse_list(args.task_lists[2]) # Input file paths
+    struct_list   = parse_list(args.task_lists[3]) # Structure file paths
+    output_list   = parse_list(args.task_lists[4]) # LAMMPs output write paths
 
     n = len(ff_list)
     assert all(len(lst) == n for lst in (control_list, input_list, struct_list, output_list)), "All lists must be same length"
 
-    lmp = lammps.lammps(cmdargs=["-log", "none", "-screen", "os.devnull"])
+    # Read the shared inputs from node-local copies if the planner was given --stage_dir
+    ff_list, control_list, input_list = stage_lists(ff_list, control_list, input_list)
+
+    # Report the speedup of the accelerators on this batch's first structure instead of running it
+    if args.benchmark:
+        with tempfile.TemporaryDirectory() as tmp:
+            benchmark(input_list[0], {'ff_filename': ff_list[0], 'control_filename': control_list[0],
+                                      'structure': struct_list[0], 'elements': get_elements(struct_list[0]),
+                                      'dump_file': os.path.join(tmp, 'dump_*.dump'), 'resume': 0, 'restart_file': 'none',
+                                      'checkpoint_every': 0, 'checkpoint_a': 'none', 'checkpoint_b': 'none', 'append': 'no'},
+                      threads=args.threads)
+        raise SystemExit(0)
+
+    # 0) Split the MPI ranks into partitions; each runs its share of the structures on its own instance
+    comm, partition, n_partitions = split_partitions(args.partition_size)
+    share = partition_share([read_natoms(struct) for struct in struct_list], partition, n_partitions)
+
+    accelerator_args, _, _ = accelerator_cmdargs(args.accelerator, args.threads) # e.g. -sf omp -pk omp N
+    lmp = lammps.lammps(comm=comm, cmdargs=["-log", "none", "-screen", "os.devnull"] + accelerator_args)
+    state_db = open_from_env() if is_root(comm) else None # Report progress if the planner was given --state_db
+    results = BatchResults.from_env(output_list, is_root(comm), partition, n_partitions) # Write energies/forces to one file if the planner was given --results_file
+    runner = SinglePointRunner(lmp) # Reuses the set up system for consecutive single points with the same topology
+
+    # Single points found in the evaluation cache (if the planner was given --eval_cache) are not run again;
+    # their results only go to the batch results file, so the cache is used only when one is written
+    cache = EvalCache.from_env() if results is not None else None
+    single_points = {inp: is_single_point(inp) for inp in set(input_list)} if cache is not None else {}
+
+    # Structure-major order: runs of one structure with many ffields only swap the force field
+    order = sorted(share, key=lambda i: (struct_list[i], input_list[i], control_list[i], i))
+
+    def prefetch(idx):
+        ''' Parse structure idx on the prefetch thread while the previous one runs '''
+        try:
+            data = read_lammps_data(struct_list[idx])
+        except Exception:
+            data = None # Not a data file the fast path understands; LAMMPs reads it itself
+        return get_elements(struct_list[idx]), data
+
+    for idx, prefetched in Prefetcher(prefetch, order, depth=2):
+        ff, ctrl, inp, struct, output = ff_list[idx], control_list[idx], input_list[idx], struct_list[idx], output_list[idx]
+        with record_task(state_db, output):
+            # 1a) Resume from this output's last checkpoint if an earlier launch was killed
+            restart_file = set_lammps_checkpoint_variables(lmp, output, args.checkpoint_every)
+
+            # 1b) Open a new log file in the output path (appended to when resuming)
+            lmp.command(f"log {os.path.join(output, 'log.lammps')}{' append' if restart_file else ''}")
+
+            # 1c) Set the lammps dumpfile name
+            lmp.command(f"variable dump_file string {os.path.join(output, 'dump_*.dump')}")
 
-    for idx, (ff, ctrl, inp, struct, output) in enumerate(zip(ff_list, control_list, input_list, struct_list, output_list), start=0):
-        # 1a) Open a new log file in the output path
-        lmp.command(f"log {os.path.join(output, 'log.lammps')}")
+            # 2) Pass in your filenames
+            if ff:
+                lmp.command(f"variable ff_filename string {ff}")
+            if struct:
+                lmp.command(f"variable structure string {struct}")
+            if ctrl:
+                lmp.command(f"variable control_filename string {ctrl}")
 
-        # lb) Set the lammps dumpfile name
-        lmp.command(f"variable dump_file string {os.path.join(output, 'dump_*.dump')}")
+            # 3) Determine the pair coefficient (parsed ahead of time by the prefetch thread)
+            elements, data = prefetched.get()
+            lmp.command(f'variable elements string "{elements}"')
 
-        # 2) Pass in your filenames
-        if ff:
-            lmp.command(f"variable ff_filename string {ff}")
-        if struct:
-            lmp.command(f"variable structure string {struct}")
-        if ctrl:
-            lmp.command(f"variable control_filename string {ctrl}")
+            # 4a) Look the single point up in the evaluation cache; the root rank decides for the whole instance
+            key = single_point_key(ff, inp, ctrl, struct, elements) if single_points.get(inp) else None
+            record = cache.get(key) if key is not None and is_root(comm) else None
+            if key is not None and comm is not None:
+                record = comm.bcast(record, root=0)
 
-        # 3) Determine the pair coefficient
-        elements = get_elements(struct)
-        lmp.command(f'variable elements string "{elements}"')
+            # 4b) Otherwise run the LAMMPS input; the system is cleared before the next full run
+            if record is None:
+                runner.run(inp, ff, ctrl, struct, elements, data=data)
+                if results is not None:
+                    record = extract_lammps_results(lmp, elements)
+                if key is not None and is_root(comm):
+                    cache.put(key, record)
 
-        # 4) Run the LAMMPS input
-        lmp.file(inp)
+            # 5) Keep the results in memory for the batch results file
+            if results is not None:
+                results.add(output, record)
 
-        # 5) Clear for the next iteration
-        lmp.command("clear")
+            # 6) The run finished; a relaunch starts it from scratch
+            if is_root(comm):
+                clear_lammps_checkpoints(output)
 
     # Final cleanup
+    if results is not None:
+        results.write()
     lmp.close()
@@ -1,5 +1,8 @@
 import ast
+import os
+from functools import lru_cache
 from pymatgen.io.lammps.data import LammpsData
+from pymatgen.core.periodic_table import Element
 #from torch_sim.quantities import calc_kinetic_energy, calc_temperature
 
 def parse_list(arg):
@@ -19,8 +22,82 @@ def parse_list(arg):
 
 def get_elements(structure_path, styles=['full', 'charge', 'atomic']):
     """
-    Determine which elements are present in each structure.
+    Determine which elements are present in each structure, in atom type order.
     Used to set the lammps pair_coefficient flags.
+
+    Only the header and Masses section are read (see read_masses_elements); results are
+    cached by path and modification time. Falls back to LammpsData if there is no Masses section.
+    """
+    mtime = os.path.getmtime(structure_path)
+    elements = _cached_elements(os.path.abspath(structure_path), mtime)
+    if elements is None:
+        elements = get_elements_from_LammpsData(structure_path, styles=styles)
+    return elements
+
+@lru_cache(maxsize=4096)
+def _cached_elements(structure_path, mtime):
+    return read_masses_elements(structure_path)
+
+def read_masses_elements(structure_path):
+    """
+    Element symbols of a LAMMPs data file from its Masses section, ordered by atom type.
+    A symbol in the line comment (e.g. `1 208.98 # Bi`) is used when present; otherwise
+    the element with the closest standard atomic mass. Returns None without a Masses section.
+    """
+    masses = {}
+    with open(structure_path) as fh:
+        next(fh, None) # The first line is a title
+        in_masses = False
+        for line in fh:
+            content, _, comment = line.partition('#')
+            tokens = content.split()
+            if not in_masses:
+                if tokens and tokens[0] == 'Masses':
+                    in_masses = True
+                elif tokens and tokens[0] in ['Atoms', 'Velocities', 'Pair', 'PairIJ', 'Bonds']:
+                    return None # Masses comes before the body sections
+                continue
+            if not tokens:
+                if masses:
+                    break
+                continue
+            if not tokens[0].isdigit():
+                break
+            label = comment.split()[0] if comment.split() else None
+            masses[int(tokens[0])] = (float(tokens[1]), label)
+    if not masses:
+        return None
+    return ' '.join(_element_symbol(mass, label) for _, (mass, label) in sorted(masses.items()))
+
+def read_natoms(structure_path):
+    """
+    Number of atoms from the header of a LAMMPs data file; 1 if it cannot be read.
+    """
+    try:
+        with open(structure_path) as fh:
+            next(fh, None)
+            for line in fh:
+                tokens = line.split('#', 1)[0].split()
+                if len(tokens) == 2 and tokens[1] == 'atoms':
+                    return int(tokens[0])
+                if tokens and tokens[0] in ['Masses', 'Atoms']:
+                    break
+    except (OSError, ValueError):
+        pass
+    return 1
+
+def _element_symbol(mass, label=None):
+    if label is not None and Element.is_valid_symbol(label):
+        return label
+    return min(_element_masses(), key=lambda item: abs(item[1] - mass))[0]
+
+@lru_cache(maxsize=1)
+def _element_masses():
+    return [(el.symbol, float(el.atomic_mass)) for el in Element if el.atomic_mass is not None]
+
+def get_elements_from_LammpsData(structure_path, styles=['full', 'charge', 'atomic']):
+    """
+    Element list from a full LammpsData parse, trying each atom style in turn.
     """
     for style in styles:
         try:
@@ -35,18 +112,44 @@ def get_elements(structure_path, styles=['full', 'charge', 'atomic']):
         return elements
     return None
 
+def model_output(state, model, memo):
+    """
+    model(state), evaluated once per state: property calculators called for the same
+    reporting step share one forward pass. memo is a dict owned by the calculators; it
+    holds the state and its positions tensor, so neither address can be reused by a later
+    state while the output is kept.
+    """
+    positions = state.positions
+    if memo.get('state') is not state or memo.get('positions') is not positions or memo.get('version') != positions._version:
+        memo.update(state=state, positions=positions, version=positions._version, output=model(state))
+    return memo['output']
+
+def state_energy(state, model, memo):
+    ''' The energy the integrator already computed at these positions, else one shared model call '''
+    energy = getattr(state, 'energy', None)
+    return energy if energy is not None else model_output(state, model, memo)["energy"]
+
+def state_forces(state, model, memo):
+    forces = getattr(state, 'forces', None)
+    return forces if forces is not None else model_output(state, model, memo)["forces"]
+
 def make_prop_calculators(mapping):
     """
     Given a dict of { name: freq }, return the prop_calculators dict
     where each name is wired up to the correct lambda for MaceModel.
     Supported names: 'potential_energy', 'kinetic_energy', 'temperature', 'forces'
+    Energies and forces come from the integrator's state when it carries them, and
+    otherwise from a single model evaluation shared by all calculators.
     """
+    from torch_sim.quantities import calc_kinetic_energy, calc_temperature
+
+    memo = {}
     pc = {}
     for name, freq in mapping.items():
         if name == "potential_energy":
-            func = lambda s, m: m(s)["energy"]
+            func = lambda s, m: state_energy(s, m, memo)
         elif name == "forces":
-            func = lambda s, m: m(s)["forces"].cpu()
+            func = lambda s, m: state_forces(s, m, memo).cpu()
         elif name == "kinetic_energy":
             func = lambda s, m: calc_kinetic_energy(
                 momenta=s.momenta,
@@ -2,9 +2,10 @@ import argparse
 import sys
 import os
 from pathlib import Path
-from EnsembleFFFit.matensemble.base import LammpsMatEnsemble
+from EnsembleFFFit.matensemble.base import add_report_arguments, report_options, LammpsMatEnsemble
+from EnsembleFFFit.matensemble.preflight import preflight_tasks, report_failures
 
-def main():
+def build_parser():
     parser = argparse.ArgumentParser(description="Argument parser to run LAMMPs with Flux using Python")
 
     # Parse NoneType for dictionary 
@@ -41,12 +42,27 @@ def main():
     parser.add_argument("--cpus_per_task", "-cpt", help="CPUs per task", type=int, default=1)
     parser.add_argument("--gpus_per_task", "-gpt", help="GPUs per task", type=int, default=0)
     parser.add_argument("--add_task_command", "-atc", help="Prepend to task command", type=str, default='')
+    parser.add_argument("--driver_args", "-da", help="Options passed to --lammps_task before the task lists, e.g. '--partition_size 4'", type=str, default='')
     parser.add_argument("--dry_run", "-dry", help="Only print the structures to be run", action='store_true')
+    parser.add_argument("--stage_dir", "-sd", type=none_or_str, help="Node-local directory the drivers copy the shared ffield/control/input/model files to once per node ('tmp' for the temp dir)", default=None)
+    parser.add_argument("--results_file", "-rf", type=none_or_str, help="Name of a .npz file the drivers write in each batch directory with the energies, forces, per-atom energies and positions of its structures", default=None)
+    parser.add_argument("--model_manifest", "-mf", type=none_or_str, help="Manifest written by create_lammps_models; only tasks whose --ffield is a converted model current with its source are run", default=None)
+    parser.add_argument("--eval_cache", "-ec", type=none_or_str, help="Evaluation cache directory; with --results_file, cached single points are not run and their results go to the batch's cached results file", default=None)
+    add_report_arguments(parser)
+    parser.add_argument("--state_db", "-db", type=none_or_str, help="Run-state SQLite database; done tasks are skipped and the drivers report progress to it", default=None)
+
+    # Pre-flight validation
+    parser.add_argument("--preflight", "-pf", help="Parse every structure and potential before launching; exclude bad tasks", action='store_true')
+    parser.add_argument("--preflight_workers", "-pfw", help="Processes used for pre-flight checks (default: all cores)", type=int, default=None)
+    parser.add_argument("--preflight_file", "-pff", help="File listing the excluded tasks and why", type=none_or_str, default='preflight_failures.txt')
+    return parser
 
-    args = parser.parse_args()
+def main():
+    args = build_parser().parse_args()
     run_lammps(args)
 
-def run_lammps(args):
+def plan_lammps(args):
+    ''' Build the LammpsMatEnsemble object and the keyword arguments for its run() call '''
     # Construct an options dictionary and only keep keys without null values
     options = {'ffield': args.ffield, 
                'in_lammps': args.in_lammps,
@@ -85,6 +101,34 @@ def run_lammps(args):
         inputs_directory=args.inputs_directory
     )
 
+    # Run only the converted models that are current with their source MACE model
+    if args.model_manifest is not None:
+        task_arg_list, run_paths = lammps_matensemble.keep_converted_models(task_arg_list, run_paths, args.lammps_task_order, args.model_manifest)
+
+    # Skip tasks the run-state database already records as done
+    if args.state_db is not None:
+        task_arg_list, run_paths = lammps_matensemble.drop_done_tasks(task_arg_list, run_paths, args.state_db)
+
+    # Take single points already evaluated (same ffield, structure and settings) from the evaluation cache;
+    # run() writes their results and marks them done
+    cached, cached_state_tasks = {}, []
+    if args.eval_cache is not None and args.results_file is not None:
+        task_args = dict(zip(run_paths, task_arg_list))
+        task_arg_list, run_paths, cached = lammps_matensemble.drop_cached_tasks(task_arg_list, run_paths, args.lammps_task_order, args.eval_cache)
+        cached_state_tasks = lammps_matensemble.state_tasks_from_runs([task_args[p] for p in cached], list(cached), args.lammps_task_order)
+        if cached:
+            print(f'{len(cached)} single points found in the evaluation cache')
+
+    # Exclude tasks with missing files, unreadable structures or elements missing from the ffield/model
+    if args.preflight:
+        n_total = len(task_arg_list)
+        task_arg_list, run_paths, failures = preflight_tasks(task_arg_list, run_paths, args.lammps_task_order,
+                                                             structure_labels=['structure'],
+                                                             potential_label='ffield' if 'ffield' in args.lammps_task_order else None,
+                                                             atom_style=args.atom_style,
+                                                             workers=args.preflight_workers)
+        report_failures(failures, n_total, args.preflight_file)
+
     # Correct the run paths based on the location of --in_lammps file
     #run_paths = lammps_matensemble.modify_write_paths(task_arg_list, run_paths, args.run_directory, args.inputs_directory)
 
@@ -97,17 +141,31 @@ def run_lammps(args):
     structure_paths = [task_arg_list[i][args.lammps_task_order.index('structure')][0] for i in range(len(task_arg_list))]
     tasks = lammps_matensemble.get_tasks(structure_paths, atoms_per_task=args.atoms_per_task)
 
-    # Execute the MatEnsemble call
     full_command = lammps_matensemble.generic_task_command(lammps_task_command, user_command=args.add_task_command)
-    lammps_matensemble.run(dry_run=True if args.dry_run else False,
-                           task_command=full_command, 
-                           run_tasks=tasks,
-                           cpus_per_task=args.cpus_per_task, 
-                           gpus_per_task=args.gpus_per_task,
-                           task_arg_list=task_arg_list, 
-                           task_dir_list=run_paths, 
-                           make_paths_list=make_paths)
+    if args.driver_args:
+        full_command = f"{full_command} {args.driver_args.strip()}"
+    plan = {'task_command': full_command, 
+            'run_tasks': tasks,
+            'cpus_per_task': args.cpus_per_task, 
+            'gpus_per_task': args.gpus_per_task,
+            'task_arg_list': task_arg_list, 
+            'task_dir_list': run_paths, 
+            'make_paths_list': make_paths,
+            'state_db': args.state_db,
+            'report': report_options(args),
+            'results_file': args.results_file,
+            'stage_dir': args.stage_dir,
+            'eval_cache': args.eval_cache if args.results_file is not None else None,
+            'cached_results': cached,
+            'cached_state_tasks': cached_state_tasks,
+            'state_tasks': lammps_matensemble.state_tasks_from_batches(task_arg_list, run_paths, args.lammps_task_order)}
+    return lammps_matensemble, plan
+
+def run_lammps(args):
+    lammps_matensemble, plan = plan_lammps(args)
 
+    # Execute the MatEnsemble call
+    lammps_matensemble.run(dry_run=True if args.dry_run else False, **plan)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,84 @@
+import heapq
+
+# Multi-partition mode for the LAMMPs drivers. The MPI ranks of a task are split into
+# partitions of --partition_size ranks, each with its own LAMMPs instance, and the batch's
+# structures are spread over the partitions. Small cells that cannot use many ranks for
+# spatial decomposition then scale with the number of cores given to the task.
+# budget_batches splits a batch into sub-batches that fit a memory budget for drivers
+# that evaluate many structures at once (torch_sim_mace).
+
+def split_partitions(partition_size=None):
+    """
+    Split MPI_COMM_WORLD into partitions of partition_size ranks; leftover ranks join the
+    last partition. Returns (comm, partition, n_partitions) where comm is the communicator
+    for this rank's LAMMPs instance, or None (LAMMPs' default, one partition) when no
+    partitions are used: without --partition_size, with fewer ranks than partition_size,
+    without mpi4py or with a LAMMPs library built without MPI.
+    """
+    if not partition_size:
+        return None, 0, 1
+    try:
+        from mpi4py import MPI
+    except ImportError:
+        print('mpi4py is not available; running all structures on one LAMMPs instance')
+        return None, 0, 1
+
+    world = MPI.COMM_WORLD
+    if partition_size >= world.size:
+        return None, 0, 1
+    if not lammps_has_mpi():
+        print('LAMMPs was built without MPI; running all structures on one LAMMPs instance')
+        return None, 0, 1
+    n_partitions = world.size // partition_size
+    partition = min(world.rank // partition_size, n_partitions - 1)
+    return world.Split(partition, world.rank), partition, n_partitions
+
+def lammps_has_mpi():
+    ''' True if the LAMMPs library has real MPI support, so it can take an mpi4py communicator '''
+    import lammps
+    probe = lammps.lammps(cmdargs=["-log", "none", "-screen", "none", "-nocite"])
+    try:
+        return probe.has_mpi_support
+    finally:
+        probe.close()
+
+def is_root(comm):
+    ''' True on the rank that writes files and reports progress for a LAMMPs instance '''
+    return comm is None or comm.Get_rank() == 0
+
+def partition_share(weights, partition, n_partitions):
+    """
+    Indices of the structures handled by this partition. Structures are assigned largest
+    first to the least loaded partition (weights are e.g. atom counts); every rank computes
+    the same assignment, so no communication is needed.
+    """
+    if n_partitions <= 1:
+        return set(range(len(weights)))
+    loads = [(0, p) for p in range(n_partitions)]
+    share = set()
+    for i in sorted(range(len(weights)), key=lambda i: -weights[i]):
+        load, p = heapq.heappop(loads)
+        if p == partition:
+            share.add(i)
+        heapq.heappush(loads, (load + weights[i], p))
+    return share
+
+def budget_batches(weights, budget):
+    """
+    Split indices into sub-batches whose total weight (e.g. atom count) is at most budget,
+    packing the largest first into the first sub-batch with room. An item heavier than the
+    budget gets a sub-batch of its own. Indices keep their input order within a sub-batch.
+    """
+    if not budget:
+        return [list(range(len(weights)))] if len(weights) else []
+    batches, loads = [], []
+    for i in sorted(range(len(weights)), key=lambda i: -weights[i]):
+        for b, load in enumerate(loads):
+            if load + weights[i] <= budget:
+                batches[b].append(i)
+                loads[b] += weights[i]
+                break
+        else:
+            batches.append([i])
+            loads.append(weights[i])
+    return [sorted(batch) for batch in batches]
@@ -0,0 +1,71 @@
+import torch
+from torch_sim.trajectory import TrajectoryReporter
+
+# TorchSim trajectory output taken off the integration loop. report() runs on the main thread
+# only for what needs the state and model (copying states and evaluating the property
+# calculators); the HDF5 writes are queued on an AsyncWriter and made in chunks of frames.
+
+class WriteBehindReporter(TrajectoryReporter):
+    """
+    A TrajectoryReporter whose file writes run on `writer` (an AsyncWriter). Each trajectory's
+    states and properties are held for `chunk_frames` reports and written with one
+    write_state/write_arrays call. finish() queues the remaining frames and the file closes;
+    writer.flush() or writer.close() waits for them. The trajectory files are only touched by
+    the writer thread once created, so flush the writer before creating the next reporter.
+    """
+    def __init__(self, filenames, writer, state_frequency=100, chunk_frames=10, **kwargs):
+        self.writer = writer
+        self.chunk_frames = max(int(chunk_frames), 1)
+        super().__init__(filenames, state_frequency, **kwargs)
+
+    def load_new_trajectories(self, filenames):
+        super().load_new_trajectories(filenames)
+        self.states = [[] for _ in self.trajectories] # (step, state on the CPU) held per trajectory
+        self.props = [[] for _ in self.trajectories]  # (step, {name: array}) held per trajectory
+
+    def report(self, state, step, model=None):
+        if self.filenames is not None and state.n_systems != len(self.trajectories):
+            raise ValueError(f"Number of systems ({state.n_systems}) doesn't match "
+                             f"number of trajectory files ({len(self.trajectories)})")
+
+        all_props = []
+        for idx, substate in enumerate(state.split()):
+            if self.state_frequency and step % self.state_frequency == 0 and self.filenames is not None:
+                self.states[idx].append((step, substate.clone().to(device='cpu')))
+
+            props = {}
+            for report_frequency, calculators in self.prop_calculators.items():
+                if report_frequency == 0 or step % report_frequency != 0:
+                    continue
+                for prop_name, prop_fn in calculators.items():
+                    prop = prop_fn(substate, model)
+                    props[prop_name] = (prop.unsqueeze(0) if len(prop.shape) == 0 else prop).detach().cpu()
+            if props and self.filenames is not None:
+                self.props[idx].append((step, props))
+            all_props.append(props)
+
+            if len(self.states[idx]) >= self.chunk_frames or len(self.props[idx]) >= self.chunk_frames:
+                self._submit(idx)
+        return all_props
+
+    def _submit(self, idx):
+        ''' Queue trajectory idx's held states and properties as one write each '''
+        trajectory = self.trajectories[idx]
+        if self.states[idx]:
+            steps, states = zip(*self.states[idx])
+            self.writer.submit(trajectory.write_state, list(states), list(steps), **self.state_kwargs)
+        # Properties of one chunk may be computed at different steps, so they are written per name
+        for name in dict.fromkeys(name for _, props in self.props[idx] for name in props):
+            rows = [(step, props[name]) for step, props in self.props[idx] if name in props]
+            self.writer.submit(trajectory.write_arrays, {name: torch.stack([value for _, value in rows])},
+                               [step for step, _ in rows])
+        self.states[idx], self.props[idx] = [], []
+
+    def finish(self):
+        for idx, trajectory in enumerate(self.trajectories):
+            self._submit(idx)
+            self.writer.submit(trajectory.close)
+        self.trajectories = []
+
+    def close(self):
+        self.finish()
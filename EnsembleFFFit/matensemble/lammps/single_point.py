@@ -0,0 +1,252 @@
+import os
+import numpy as np
+from EnsembleFFFit.matensemble.eval_cache import eval_key
+
+# Single point fast path for the LAMMPs drivers. When consecutive structures share the
+# input script, control file, element list and topology (atom count, types by ID, masses,
+# box shape), the system set up by the first structure is kept: only the box, positions
+# and charges are replaced, and a new force field only re-issues pair_style, pair_coeff
+# and the QEq fix, before the next `run 0`. Anything else falls back to `clear` + the
+# full input script.
+
+# Commands that make an input script more than one energy/force evaluation
+NOT_SINGLE_POINT = ['minimize', 'rerun', 'include', 'jump', 'next', 'label', 'clear', 'create_atoms', 'read_restart', 'read_dump']
+
+# Atom section column layout for the supported atom styles: (type column, charge column, first x column)
+ATOM_STYLE_COLUMNS = {'atomic': (1, None, 2), 'charge': (1, 2, 3), 'full': (2, 3, 4)}
+
+def read_script_commands(input_path):
+    ''' Commands of a LAMMPs input script, comments and continuation lines resolved '''
+    commands, current = [], ''
+    with open(input_path) as fh:
+        for line in fh:
+            line = line.split('#', 1)[0].rstrip()
+            if line.endswith('&'):
+                current += line[:-1] + ' '
+                continue
+            current += line
+            if current.strip():
+                commands.append(current.strip())
+            current = ''
+    if current.strip():
+        commands.append(current.strip())
+    return commands
+
+def is_single_point(input_path):
+    """
+    True if the input script reads one data file and ends in a single `run 0`.
+    """
+    commands = read_script_commands(input_path)
+    names = [cmd.split()[0] for cmd in commands]
+    if not names or names[-1] != 'run' or names.count('run') != 1 or names.count('read_data') != 1:
+        return False
+    if commands[-1].split()[1] != '0':
+        return False
+    return not any(name in NOT_SINGLE_POINT for name in names)
+
+def single_point_key(ff, inp, ctrl, struct, elements):
+    """
+    Evaluation cache key of one single point run: the force field and structure contents,
+    the input script and control file contents, and the element list. The planner and the
+    drivers compute the same key for the same task.
+    """
+    return eval_key(ff, struct, [inp, ctrl], elements=elements)
+
+def force_field_commands(commands):
+    """
+    The pair_style, pair_coeff and QEq fix commands of an input script; re-issuing them after
+    changing ${ff_filename} swaps the force field without touching the atoms.
+    """
+    ff_commands = []
+    for cmd in commands:
+        tokens = cmd.split()
+        if tokens[0] in ['pair_style', 'pair_coeff'] or (tokens[0] == 'fix' and len(tokens) > 3 and tokens[3].startswith('qeq')):
+            ff_commands.append(cmd)
+    return ff_commands
+
+def read_lammps_data(data_path, atom_style=None):
+    """
+    Minimal reader for the LAMMPs data files the drivers use (atomic, charge or full
+    atom styles, orthogonal or triclinic boxes). Much faster than LammpsData for large batches.
+
+    Returns a dictionary with box, tilt, masses, ids, types, charges (or None),
+    positions and velocities (or None), all ordered by atom ID.
+    """
+    with open(data_path) as fh:
+        lines = fh.readlines()
+
+    box, tilt, masses = {}, (0.0, 0.0, 0.0), {}
+    natoms, sections, i = None, {}, 1
+    while i < len(lines):
+        tokens = lines[i].split('#', 1)[0].split()
+        if not tokens:
+            i += 1
+            continue
+        if tokens[-1] == 'atoms' and len(tokens) == 2:
+            natoms = int(tokens[0])
+        elif len(tokens) == 4 and tokens[2].endswith('lo') and tokens[3].endswith('hi'):
+            box[tokens[2][0]] = (float(tokens[0]), float(tokens[1]))
+        elif tokens[-3:] == ['xy', 'xz', 'yz']:
+            tilt = tuple(float(t) for t in tokens[:3])
+        elif tokens[0] in ['Masses', 'Atoms', 'Velocities']:
+            name = tokens[0]
+            style_hint = lines[i].split('#', 1)[1].strip() if '#' in lines[i] else None
+            i += 1
+            while i < len(lines) and not lines[i].strip():
+                i += 1
+            n_rows = natoms if name != 'Masses' else None
+            rows = []
+            while i < len(lines) and lines[i].strip() and (n_rows is None or len(rows) < n_rows):
+                rows.append(lines[i].split('#', 1)[0].split())
+                i += 1
+            sections[name] = (rows, style_hint)
+            continue
+        i += 1
+
+    if natoms is None or 'Atoms' not in sections:
+        raise ValueError(f'{data_path} has no atoms')
+
+    for row in sections.get('Masses', ([], None))[0]:
+        masses[int(row[0])] = float(row[1])
+
+    rows, style_hint = sections['Atoms']
+    atom_style = atom_style or style_hint or {5: 'atomic', 8: 'atomic', 6: 'charge', 9: 'charge', 7: 'full', 10: 'full'}.get(len(rows[0]))
+    if atom_style not in ATOM_STYLE_COLUMNS:
+        raise ValueError(f'Unsupported atom style {atom_style} in {data_path}')
+    type_col, charge_col, x_col = ATOM_STYLE_COLUMNS[atom_style]
+
+    table = np.array(rows, dtype=float)
+    order = np.argsort(table[:, 0])
+    table = table[order]
+
+    velocities = None
+    if 'Velocities' in sections:
+        vel = np.array(sections['Velocities'][0], dtype=float)
+        velocities = vel[np.argsort(vel[:, 0])][:, 1:4]
+
+    return {
+        'atom_style': atom_style,
+        'box': [box[d] for d in 'xyz'],
+        'tilt': tilt, # xy, xz, yz
+        'masses': masses,
+        'ids': table[:, 0].astype(int),
+        'types': table[:, type_col].astype(int),
+        'charges': table[:, charge_col] if charge_col is not None else None,
+        'positions': table[:, x_col:x_col+3],
+        'velocities': velocities,
+    }
+
+class SinglePointRunner:
+    """
+    Runs single point input scripts on one LAMMPs instance, reusing the set up system
+    (pair style, force field, QEq fix, computes, dumps) across structures with the same
+    topology. The box is changed with change_box, positions and charges are written
+    through the Python API, and `run 0` rebuilds the neighbor lists and re-solves the charges.
+    The same structure with another force field is not re-read at all.
+
+    QEq starts from the previous structure's solution rather than from scratch, so energies
+    agree with the full path to within the QEq tolerance rather than bit for bit.
+    """
+    def __init__(self, lmp):
+        self.lmp = lmp
+        self.key = None # (input, control, elements, topology...) of the system currently set up in lmp
+        self.struct_id = None # (path, mtime) of the structure currently in lmp
+        self.ff = None
+        self.ff_commands = [] # pair_style / pair_coeff / QEq fix lines re-issued to swap force fields
+        self.output_commands = [] # dump / dump_modify lines re-issued for each structure
+        self.dump_ids = []
+        self.n_fast = 0
+        self.n_full = 0
+        self._single_point = {}
+
+    def single_point(self, input_path):
+        if input_path not in self._single_point:
+            self._single_point[input_path] = is_single_point(input_path)
+        return self._single_point[input_path]
+
+    def topology(self, data):
+        return (data['atom_style'], len(data['ids']), tuple(data['types']),
+                tuple(sorted(data['masses'].items())), any(data['tilt']))
+
+    def structure_id(self, struct):
+        return (os.path.abspath(struct), os.path.getmtime(struct))
+
+    def run(self, inp, ff, ctrl, struct, elements, data=None):
+        """
+        Evaluate struct with the input script inp and force field ff. Variables (log, dump
+        file, ff_filename, elements, ...) must already be set on self.lmp. `data` may be
+        read_lammps_data(struct) parsed ahead of time. Returns True if the fast path was used.
+        """
+        if self.key is not None and self.single_point(inp):
+            try:
+                # The same structure again (structure-major batches) needs no data file read
+                struct_id = self.structure_id(struct)
+                new_structure = struct_id != self.struct_id
+                if new_structure and data is None:
+                    data = read_lammps_data(struct)
+                topology = self.topology(data) if new_structure else self.key[3:]
+                if (inp, ctrl, elements) + topology == self.key:
+                    if new_structure:
+                        self.update_system(data)
+                    if ff != self.ff:
+                        self.swap_force_field()
+                    self.reissue_output()
+                    self.lmp.command(self.run_command)
+                    self.struct_id, self.ff = struct_id, ff
+                    self.n_fast += 1
+                    return True
+            except Exception:
+                pass # e.g. atoms lost after the box change; redo this structure from scratch
+
+        self.full_run(inp)
+        if self.single_point(inp):
+            try:
+                self.key = (inp, ctrl, elements) + self.topology(data if data is not None else read_lammps_data(struct))
+                self.struct_id, self.ff = self.structure_id(struct), ff
+            except Exception:
+                self.key = None
+        self.n_full += 1
+        return False
+
+    def full_run(self, inp):
+        if self.n_full or self.n_fast:
+            self.lmp.command("clear")
+        self.key = None
+        self.lmp.file(inp)
+        if self.single_point(inp):
+            commands = read_script_commands(inp)
+            self.run_command = commands[-1]
+            self.ff_commands = force_field_commands(commands)
+            self.output_commands = [cmd for cmd in commands if cmd.split()[0] in ['dump', 'dump_modify']]
+            self.dump_ids = [cmd.split()[1] for cmd in self.output_commands if cmd.split()[0] == 'dump']
+
+    def update_system(self, data):
+        lmp = self.lmp
+        (xlo, xhi), (ylo, yhi), (zlo, zhi) = data['box']
+        box = f"x final {xlo} {xhi} y final {ylo} {yhi} z final {zlo} {zhi}"
+        if any(data['tilt']):
+            xy, xz, yz = data['tilt']
+            box += f" xy final {xy} xz final {xz} yz final {yz}"
+        lmp.command(f"change_box all {box} units box") # Atoms are not remapped; their positions are replaced below
+
+        # Atoms are written by ID on each rank; run 0 remaps them into the new box and migrates them
+        nlocal = lmp.extract_global('nlocal')
+        index = np.searchsorted(data['ids'], lmp.numpy.extract_atom('id')[:nlocal])
+        lmp.numpy.extract_atom('x')[:nlocal] = data['positions'][index]
+        if data['charges'] is not None:
+            lmp.numpy.extract_atom('q')[:nlocal] = data['charges'][index]
+        velocities = data['velocities'][index] if data['velocities'] is not None else 0.0
+        lmp.numpy.extract_atom('v')[:nlocal] = velocities
+        lmp.command("set group all image 0 0 0")
+
+    def swap_force_field(self):
+        ''' Re-issue pair_style, pair_coeff and the QEq fix with the current ${ff_filename} '''
+        for cmd in self.ff_commands:
+            self.lmp.command(cmd)
+
+    def reissue_output(self):
+        ''' New dump files for this structure '''
+        for dump_id in self.dump_ids:
+            self.lmp.command(f"undump {dump_id}")
+        for cmd in self.output_commands:
+            self.lmp.command(cmd)
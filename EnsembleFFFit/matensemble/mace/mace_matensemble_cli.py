@@ -1,9 +1,10 @@
 import argparse
 from copy import deepcopy
 import os
-from EnsembleFFFit.matensemble.base import MACEMatEnsemble
+from EnsembleFFFit.matensemble.base import add_report_arguments, report_options, MACEMatEnsemble
+from EnsembleFFFit.matensemble.preflight import preflight_tasks, report_failures
 
-def main():
+def build_parser():
   # create parser
   parser = argparse.ArgumentParser(description='MACE refitting driver')
   
@@ -32,11 +33,21 @@ def main():
   parser.add_argument("--fits_per_runpath", "-fpr", help="Number of MACE fits for each runpath", type=int, default=1)
   parser.add_argument("--random", "-r", help="Whether to randomly generate seeds", action='store_true')
   parser.add_argument("--dry_run", "-dry", help="Only print the structures to be run", action='store_true') 
+  add_report_arguments(parser)
+  parser.add_argument("--state_db", "-db", type=none_or_str, help="Run-state SQLite database; done fits are skipped and recorded as submitted", default=None)
+
+  # Pre-flight validation
+  parser.add_argument("--preflight", "-pf", help="Parse every training/test file and model before launching; exclude bad tasks", action='store_true')
+  parser.add_argument("--preflight_workers", "-pfw", help="Processes used for pre-flight checks (default: all cores)", type=int, default=None)
+  parser.add_argument("--preflight_file", "-pff", help="File listing the excluded tasks and why", type=none_or_str, default='preflight_failures.txt')
+  return parser
 
-  args = parser.parse_args()
+def main():
+  args = build_parser().parse_args()
   run_mace(args)
 
-def run_mace(args):
+def plan_mace(args):
+  ''' Build the MACEMatEnsemble object and the keyword arguments for its run() call '''
   # Generate the options dictionary for MatEnsembleJob object initilization
   matensemble_arguments = ['run_directory', 'inputs_directory', 'check_files', 
                            'cpus_per_task', 'gpus_per_task', 'fits_per_runpath', 'dry_run']
@@ -59,11 +70,24 @@ def run_mace(args):
                                                                   labels=labels, ordered_labels=labels, 
                                                                   finished_file=None)
   
+  # Exclude tasks with missing files, unreadable .xyz files or elements missing from the foundation model
+  if args.preflight:
+    n_total = len(task_arg_list)
+    task_arg_list, run_paths, failures = preflight_tasks(task_arg_list, run_paths, labels,
+                                                         structure_labels=['train_file', 'test_file'],
+                                                         potential_label='foundation_model',
+                                                         workers=args.preflight_workers)
+    report_failures(failures, n_total, args.preflight_file)
+
   # Generate the task_arg_list and run_paths with separate run directories for different starting seeds
   task_arg_list, run_paths = mace_matensemble.construct_tasks(task_arg_list, run_paths, 
                                                               args.fits_per_runpath, args.random, 
                                                               args.finished_file)
   
+  # Skip fits the run-state database already records as done
+  if args.state_db is not None:
+    task_arg_list, run_paths = mace_matensemble.drop_done_tasks(task_arg_list, run_paths, args.state_db)
+
   # Create the arguments dictionary and yield the list of list of argparse argument strings
   task_arg_strs = mace_matensemble.to_str_list(labels=labels, 
                                                task_arg_list=task_arg_list, 
@@ -71,16 +95,24 @@ def run_mace(args):
   # Generate tasks per run based on user arguments
   tasks = mace_matensemble.get_tasks(run_paths)
 
+  plan = {'task_command': 'mace_run_train',
+          'run_tasks': tasks,
+          'cpus_per_task': args.cpus_per_task,
+          'gpus_per_task': args.gpus_per_task,
+          'task_arg_list': task_arg_strs,
+          'task_dir_list': run_paths, 
+          'make_paths_list': run_paths,
+          'state_db': args.state_db,
+          'report': report_options(args),
+          'state_tasks': mace_matensemble.state_tasks_from_runs(task_arg_list, run_paths, labels)}
+  return mace_matensemble, plan
+
+def run_mace(args):
+  mace_matensemble, plan = plan_mace(args)
+
   # Execute the MatEnsemble call
   dry_run = True if args.dry_run else False
-  mace_matensemble.run(dry_run=dry_run,
-                           task_command='mace_run_train',
-                           run_tasks=tasks,
-                           cpus_per_task=args.cpus_per_task,
-                           gpus_per_task=args.gpus_per_task,
-                           task_arg_list=task_arg_strs,
-                           task_dir_list=run_paths, 
-                           make_paths_list=run_paths)
+  mace_matensemble.run(dry_run=dry_run, **plan)
 
 if __name__ == '__main__':
   main()
@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+from EnsembleFFFit.matensemble.eval_cache import content_hash
+
+# Manifest of the MACE models converted for LAMMPs by create_lammps_models. Each entry
+# records the source model's contents (size, mtime and sha256), the conversion settings and
+# the converted file, so a later conversion skips models that are already current and the
+# LAMMPs planner only schedules converted models.
+
+MANIFEST = 'lammps_models.json'
+
+def read_manifest(path):
+    ''' {source model path: entry}, empty if the manifest does not exist yet '''
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)['models']
+
+def write_manifest(path, models):
+    ''' Write through a temporary file, so the planner never reads a partial manifest '''
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.manifest.')
+    with os.fdopen(fd, 'w') as fh:
+        json.dump({'models': models}, fh, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def source_entry(source):
+    ''' Size, mtime and content hash of a source model '''
+    stat = os.stat(source)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': content_hash(source)}
+
+def is_current(entry, source, settings):
+    """
+    True if entry records a conversion of source's current contents with these settings
+    whose output still exists. The contents are only hashed when the size or mtime changed.
+    """
+    if not entry or entry.get('settings') != settings or not os.path.exists(entry.get('output', '')):
+        return False
+    stat = os.stat(source)
+    if (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+        return True
+    return entry['sha256'] == content_hash(source)
+
+def converted_models(path):
+    ''' Absolute paths of the converted models in a manifest that are current with their source '''
+    return {os.path.abspath(entry['output']) for source, entry in read_manifest(path).items()
+            if os.path.exists(source) and is_current(entry, source, entry.get('settings'))}
@@ -0,0 +1,64 @@
+import gc
+import os
+from collections import OrderedDict
+
+# Loaded models shared across the structures of a batch. A batch usually evaluates many
+# structures with the same one or two model files; the registry loads each file once and
+# keeps the most recently used ones, instead of reading hundreds of MB per structure.
+
+def load_torch_model(path, device='cpu'):
+    """
+    torch.load with the file memory-mapped (torch >= 2.1, zipfile checkpoints), so the
+    weights are paged in from the page cache rather than read and copied up front.
+    Falls back to a plain load for older torch or legacy-format files.
+    """
+    import torch
+    try:
+        return torch.load(path, map_location=device, mmap=True, weights_only=False)
+    except (TypeError, RuntimeError):
+        return torch.load(path, map_location=device)
+
+def release_device_memory():
+    ''' Return freed GPU memory to the driver after a model is evicted '''
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+class ModelRegistry:
+    """
+    LRU cache of up to `max_models` objects built by load(path), keyed by (path, mtime)
+    so a model file rewritten during the run is loaded again.
+    e.g. ModelRegistry(lambda path: MACECalculator(models=load_torch_model(path)), max_models=2)
+    """
+    def __init__(self, load, max_models=2):
+        self.load = load
+        self.max_models = max(int(max_models), 1)
+        self.models = OrderedDict()
+        self.n_loads = 0
+        self.n_hits = 0
+
+    def key(self, path):
+        return (os.path.abspath(path), os.path.getmtime(path))
+
+    def get(self, path):
+        key = self.key(path)
+        if key in self.models:
+            self.models.move_to_end(key)
+            self.n_hits += 1
+            return self.models[key]
+
+        # Evict before loading so at most max_models are resident at once
+        while len(self.models) >= self.max_models:
+            self.models.popitem(last=False)
+            release_device_memory()
+        self.models[key] = self.load(path)
+        self.n_loads += 1
+        return self.models[key]
+
+    def clear(self):
+        self.models.clear()
+        release_device_memory()
@@ -0,0 +1,47 @@
+import numpy as np
+
+# Reduced precision and compilation for MACE inference. float32 (and torch.compile) can be
+# much faster on CPU nodes, but how much accuracy they cost depends on the model, so a fast
+# mode is only used after it reproduces float64 energies and forces on a sample of the
+# batch's own structures; otherwise the drivers fall back to float64.
+
+PRECISIONS = ['float64', 'float32']
+
+def add_precision_arguments(parser, compile=True):
+    ''' --precision (and --compile) with the validation settings, shared by the MACE drivers '''
+    parser.add_argument("--precision", "-p", choices=PRECISIONS, help="Model precision; float32 is used only if it passes the float64 comparison", default='float64')
+    if compile:
+        parser.add_argument("--compile", "-c", action='store_true', help="torch.compile the model; used only if it passes the float64 comparison")
+    parser.add_argument("--validate_structures", "-vs", type=int, help="Structures of the batch compared against float64 before a fast mode is used", default=4)
+    parser.add_argument("--energy_tol", "-etol", type=float, help="Largest accepted energy difference from float64 (eV/atom)", default=1e-3)
+    parser.add_argument("--force_tol", "-ftol", type=float, help="Largest accepted force component difference from float64 (eV/A)", default=1e-2)
+
+def compare_calculators(reference, candidate, structures):
+    ''' Largest |dE| per atom and |dF| component between two ASE calculators over structures '''
+    max_de, max_df = 0.0, 0.0
+    for atoms in structures:
+        ref, cand = atoms.copy(), atoms.copy()
+        ref.calc, cand.calc = reference, candidate
+        max_de = max(max_de, abs(ref.get_potential_energy() - cand.get_potential_energy()) / len(atoms))
+        max_df = max(max_df, float(np.abs(ref.get_forces() - cand.get_forces()).max()))
+    return max_de, max_df
+
+def validate_fast_mode(make_calculator, structures, precision='float64', compile=False, energy_tol=1e-3, force_tol=1e-2):
+    """
+    The (precision, compile) mode to run with. make_calculator(precision, compile) must build
+    a fresh calculator (its own copy of the model). A fast mode is kept only if it matches
+    float64 on structures within energy_tol (eV/atom) and force_tol (eV/A); otherwise
+    ('float64', False) is returned.
+    """
+    if precision == 'float64' and not compile:
+        return precision, compile
+    mode = f"{precision}{' + compile' if compile else ''}"
+    if not structures:
+        print(f'No structures to validate {mode} against float64; using float64')
+        return 'float64', False
+
+    max_de, max_df = compare_calculators(make_calculator('float64', False), make_calculator(precision, compile), structures)
+    accepted = max_de <= energy_tol and max_df <= force_tol
+    print(f"{mode} vs float64 on {len(structures)} structures: max |dE| = {max_de:.2e} eV/atom, "
+          f"max |dF| = {max_df:.2e} eV/A; {'using ' + mode if accepted else 'outside tolerance, using float64'}")
+    return (precision, compile) if accepted else ('float64', False)
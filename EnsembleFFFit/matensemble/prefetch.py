@@ -0,0 +1,140 @@
+import atexit
+import queue
+import signal
+import sys
+import threading
+
+# I/O pipeline for the batched drivers: a background thread reads and parses the next
+# structures while the current one runs, and another flushes finished outputs. Both queues
+# are bounded so a fast reader or a slow filesystem cannot grow memory without limit.
+
+_DONE = object()
+
+def exit_on_sigterm():
+    """
+    Turn the scheduler's SIGTERM (time limit, preemption) into SystemExit in the main thread,
+    so finally blocks and atexit handlers run and queued output is written before the
+    process ends. Later SIGTERMs are ignored while that happens.
+    """
+    def handler(signum, frame):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        sys.exit(128 + signum)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, handler)
+
+class Prefetched:
+    ''' The result of load(item); get() returns it or re-raises the error from the background thread '''
+    def __init__(self, value=None, error=None):
+        self.value = value
+        self.error = error
+
+    def get(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+class Prefetcher:
+    """
+    Iterate over (item, Prefetched) pairs in order, with load(item) running up to `depth`
+    items ahead on a background thread. Errors from load are raised by Prefetched.get(),
+    so the caller handles them in the same place as a direct call.
+    """
+    def __init__(self, load, items, depth=2):
+        self.load = load
+        self.items = list(items)
+        self.queue = queue.Queue(maxsize=max(depth, 1))
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def _put(self, result):
+        while not self.stop.is_set():
+            try:
+                self.queue.put(result, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _worker(self):
+        for item in self.items:
+            if self.stop.is_set():
+                return
+            try:
+                result = (item, Prefetched(self.load(item)))
+            except Exception as e:
+                result = (item, Prefetched(error=e))
+            self._put(result)
+        self._put(_DONE)
+
+    def __iter__(self):
+        try:
+            while True:
+                result = self.queue.get()
+                if result is _DONE:
+                    return
+                yield result
+        finally:
+            self.close()
+
+    def close(self):
+        ''' Stop reading ahead (e.g. when the caller breaks out early) '''
+        self.stop.set()
+        while True: # Unblock the worker if it is waiting on a full queue
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+class AsyncWriter:
+    """
+    Run output writes (callables) in order on a background thread. At most `max_pending`
+    writes are queued; submit() blocks beyond that. flush() waits for the queued writes and
+    close() for every write, both re-raising the first error. Writes still queued when the
+    interpreter exits (including through exit_on_sigterm) are done before it ends.
+    """
+    def __init__(self, max_pending=4):
+        self.queue = queue.Queue(maxsize=max(max_pending, 1))
+        self.error = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def _worker(self):
+        while True:
+            task = self.queue.get()
+            if task is _DONE:
+                self.queue.task_done()
+                return
+            func, args, kwargs = task
+            if self.error is None:
+                try:
+                    func(*args, **kwargs)
+                except Exception as e:
+                    self.error = e
+            self.queue.task_done()
+
+    def submit(self, func, *args, **kwargs):
+        if self.error is not None:
+            raise self.error
+        self.queue.put((func, args, kwargs))
+
+    def flush(self):
+        self.queue.join()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            atexit.unregister(self.close)
+            self.queue.put(_DONE)
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
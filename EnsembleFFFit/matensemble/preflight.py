@@ -0,0 +1,155 @@
+from concurrent.futures import ProcessPoolExecutor
+from pymatgen.io.lammps.data import LammpsData
+from pymatgen.io.ase import AseAtomsAdaptor
+from pymatgen.core.periodic_table import Element
+from ase.io import read
+import os
+import warnings
+
+# Pre-flight checks run before any nodes are requested. Every unique structure and
+# force field / model file is parsed once in a process pool, then each task is checked
+# for missing files and for structure elements that the potential does not cover.
+
+def read_structure_elements(structure_path, atom_style='charge'):
+    """
+    Parse a structure file the same way the drivers will and return its element symbols.
+    LAMMPs data files are tried with atom_style first, then the other common styles.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for style in [atom_style] + [s for s in ['full', 'charge', 'atomic'] if s != atom_style]:
+            try:
+                ld = LammpsData.from_file(structure_path, atom_style=style)
+                return sorted(str(el) for el in ld.structure.elements)
+            except Exception:
+                continue
+        try: # lammps-dump-text
+            atoms = read(structure_path, format='lammps-dump-text')
+        except Exception: # Any other ASE-readable format, e.g. POSCAR or .xyz
+            atoms = read(structure_path, index=':')
+            atoms = atoms if isinstance(atoms, list) else [atoms]
+            return sorted(set(sym for a in atoms for sym in a.get_chemical_symbols()))
+        return sorted(str(el) for el in AseAtomsAdaptor().get_structure(atoms).elements)
+
+def get_ffield_elements(ffield_path):
+    """
+    Read the element symbols from the atom section of a ReaxFF ffield file.
+    """
+    with open(ffield_path) as fh:
+        lines = fh.readlines()
+    n_general = int(lines[1].split()[0])
+    atom_header = 2 + n_general
+    n_atoms = int(lines[atom_header].split()[0])
+    first_atom = atom_header + 4
+    return sorted(lines[first_atom + 4*i].split()[0] for i in range(n_atoms))
+
+def get_model_elements(model_path):
+    """
+    Elements supported by a MACE model (.model or -mliap.pt); None if they cannot be determined.
+    """
+    try:
+        import torch
+        model = torch.load(model_path, map_location='cpu', weights_only=False)
+    except Exception:
+        return None
+    model = getattr(model, 'model', model) # LAMMPS_MLIAP_MACE wraps the MACE model
+    atomic_numbers = getattr(model, 'atomic_numbers', None)
+    if atomic_numbers is None:
+        return None
+    return sorted(str(Element.from_Z(int(z))) for z in atomic_numbers)
+
+def get_potential_elements(potential_path):
+    if potential_path.endswith(('.model', '.pt')):
+        return get_model_elements(potential_path)
+    return get_ffield_elements(potential_path)
+
+def _safe_call(func, *args):
+    ''' Return (result, None) or (None, error message) so failures survive the process pool '''
+    try:
+        return func(*args), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+def _structure_worker(args):
+    return _safe_call(read_structure_elements, *args)
+
+def _potential_worker(path):
+    return _safe_call(get_potential_elements, path)
+
+def parse_unique(worker, items, workers):
+    items = list(dict.fromkeys(items))
+    if not items:
+        return {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(worker, items, chunksize=max(1, len(items) // (4 * (workers or os.cpu_count() or 1)))))
+    return dict(zip(items, results))
+
+def preflight_tasks(task_arg_list, run_paths, labels, structure_labels, potential_label=None,
+                    atom_style='charge', workers=None):
+    """
+    Validate every task before launching.
+      - task_arg_list/run_paths: unbatched tasks; task_arg_list[i][j] is the file for labels[j]
+      - structure_labels: labels whose files are structures to parse
+      - potential_label: label of the ffield/model the structure elements must be covered by
+
+    Returns (good_task_arg_list, good_run_paths, failures) with failures a list of
+    (run_path, [reasons]).
+    """
+    existing = {}
+    for task_arg in task_arg_list:
+        for path in task_arg:
+            if path not in existing:
+                existing[path] = os.path.isfile(path)
+
+    structures = [(task_arg[labels.index(label)], atom_style) for task_arg in task_arg_list
+                  for label in structure_labels if existing[task_arg[labels.index(label)]]]
+    structure_results = parse_unique(_structure_worker, structures, workers)
+
+    potential_results = {}
+    if potential_label is not None:
+        potentials = [task_arg[labels.index(potential_label)] for task_arg in task_arg_list]
+        potential_results = parse_unique(_potential_worker, [p for p in potentials if existing[p]], workers)
+
+    good_task_args, good_run_paths, failures = [], [], []
+    for task_arg, run_path in zip(task_arg_list, run_paths):
+        reasons = [f'missing {label}: {path}' for label, path in zip(labels, task_arg) if not existing[path]]
+
+        structure_elements = set()
+        for label in structure_labels:
+            path = task_arg[labels.index(label)]
+            if not existing[path]:
+                continue
+            elements, error = structure_results[(path, atom_style)]
+            if error:
+                reasons.append(f'cannot parse {label} {path} ({error})')
+            else:
+                structure_elements.update(elements)
+
+        if potential_label is not None and existing[task_arg[labels.index(potential_label)]]:
+            potential_path = task_arg[labels.index(potential_label)]
+            elements, error = potential_results[potential_path]
+            if error:
+                reasons.append(f'cannot parse {potential_label} {potential_path} ({error})')
+            elif elements is not None and not structure_elements.issubset(elements):
+                missing = sorted(structure_elements.difference(elements))
+                reasons.append(f'elements {missing} not in {potential_label} {potential_path}')
+
+        if reasons:
+            failures.append((run_path, reasons))
+        else:
+            good_task_args.append(task_arg)
+            good_run_paths.append(run_path)
+
+    return good_task_args, good_run_paths, failures
+
+def report_failures(failures, n_total, failures_file=None):
+    print(f'Pre-flight: {n_total - len(failures)}/{n_total} tasks passed; {len(failures)} excluded')
+    lines = [f'{run_path}: {"; ".join(reasons)}' for run_path, reasons in failures]
+    for line in lines[:20]:
+        print(f'  {line}')
+    if len(lines) > 20:
+        print(f'  ... {len(lines) - 20} more')
+    if failures_file and lines:
+        with open(failures_file, 'w') as fh:
+            fh.write('\n'.join(lines) + '\n')
+        print(f'Pre-flight failures written to {failures_file}')
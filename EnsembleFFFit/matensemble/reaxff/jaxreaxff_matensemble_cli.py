@@ -2,7 +2,7 @@ import argparse
 from copy import deepcopy
 import os
 from frozendict import frozendict
-from EnsembleFFFit.matensemble.base import JaxReaxFFMatEnsemble
+from EnsembleFFFit.matensemble.base import add_report_arguments, report_options, REPORT_ARGUMENTS, JaxReaxFFMatEnsemble
 
 class SmartFormatter(argparse.ArgumentDefaultsHelpFormatter):
   def _split_lines(self, text, width):
@@ -25,7 +25,7 @@ def build_float_range_checker(min_v, max_v):
     return val
   return range_checker
 
-def main():
+def build_parser():
   # create parser
   parser = argparse.ArgumentParser(description='JAX-ReaxFF driver',
                                    formatter_class=SmartFormatter)
@@ -42,6 +42,8 @@ def main():
   parser.add_argument("--gpus_per_task", "-gpt", help="GPUs per task", type=int, default=1)
   parser.add_argument("--fits_per_runpath", "-fpr", help="Number of JaxReaxFF fits for each runpath", type=int, default=4)
   parser.add_argument("--dry_run", "-dry", help="Only print the structures to be run", action='store_true') 
+  add_report_arguments(parser)
+  parser.add_argument("--state_db", "-db", type=str, help="Run-state SQLite database; done fits are skipped and recorded as submitted", default=None)
 
   # From the Jax-ReaxFF package jaxreaxff executable. Default inputs: inital force field, parameters, geo and trainset files
   parser.add_argument('--init_FF', metavar='filename',
@@ -146,14 +148,17 @@ def main():
       type=int,
       default=0,
       help='Seed value')
+  return parser
 
-  args = parser.parse_args()
+def main():
+  args = build_parser().parse_args()
   run_reaxff(args)
 
-def run_reaxff(args):
+def plan_reaxff(args):
+  ''' Build the JaxReaxFFMatEnsemble object and the keyword arguments for its run() call '''
   # Generate the options dictionary for MatEnsembleJob object initilization
   matensemble_arguments = ['run_directory', 'inputs_directory', 'check_files', 
-                           'cpus_per_task', 'gpus_per_task', 'fits_per_runpath', 'dry_run']
+                           'cpus_per_task', 'gpus_per_task', 'fits_per_runpath', 'dry_run', 'state_db'] + REPORT_ARGUMENTS
 
   options = {'init_FF': args.init_FF,
              'params': args.params,
@@ -176,6 +181,10 @@ def run_reaxff(args):
                                                                   root1=args.inputs_directory, files1=[options[k] for k in inputs_directory_keys],
                                                                   labels=labels, ordered_labels=labels) # No ordering needed
 
+  # Skip fits the run-state database already records as done
+  if args.state_db is not None:
+    task_arg_list, run_paths = jaxreaxff_matensemble.drop_done_tasks(task_arg_list, run_paths, args.state_db)
+
   # Create the arguments dictionary and yield the list of list of argparse argument strings
   task_arg_strs = jaxreaxff_matensemble.dict_to_str_list(d=args, labels=labels, 
                                                          task_arg_list=task_arg_list, 
@@ -184,16 +193,24 @@ def run_reaxff(args):
   # Generate tasks per run based on user arguments
   tasks = jaxreaxff_matensemble.get_tasks(run_paths, args.fits_per_runpath)
 
+  plan = {'task_command': 'jaxreaxff',
+          'run_tasks': tasks,
+          'cpus_per_task': args.cpus_per_task,
+          'gpus_per_task': args.gpus_per_task,
+          'task_arg_list': task_arg_strs,
+          'task_dir_list': run_paths, 
+          'make_paths_list': run_paths,
+          'state_db': args.state_db,
+          'report': report_options(args),
+          'state_tasks': jaxreaxff_matensemble.state_tasks_from_runs(task_arg_list, run_paths, labels)}
+  return jaxreaxff_matensemble, plan
+
+def run_reaxff(args):
+  jaxreaxff_matensemble, plan = plan_reaxff(args)
+
   # Execute the MatEnsemble call
   dry_run = True if args.dry_run else False
-  jaxreaxff_matensemble.run(dry_run=dry_run,
-                           task_command='jaxreaxff',
-                           run_tasks=tasks,
-                           cpus_per_task=args.cpus_per_task,
-                           gpus_per_task=args.gpus_per_task,
-                           task_arg_list=task_arg_strs,
-                           task_dir_list=run_paths)
-
+  jaxreaxff_matensemble.run(dry_run=dry_run, **plan)
 
 if __name__ == '__main__':
   main()
@@ -0,0 +1,158 @@
+import atexit
+import os
+from glob import glob
+import numpy as np
+
+# Environment variable used to hand the per-batch results file name from the planner to the drivers
+RESULTS_ENV = 'ENSEMBLEFFFIT_RESULTS_FILE'
+
+# Per-atom arrays stored concatenated over the structures of a batch
+PER_ATOM = ['types', 'positions', 'forces', 'eatom']
+
+def box_to_cell(boxlo, boxhi, xy, yz, xz):
+    ''' LAMMPs box bounds and tilts to a 3x3 cell matrix (rows are the lattice vectors) '''
+    lx, ly, lz = np.asarray(boxhi) - np.asarray(boxlo)
+    return np.array([[lx, 0.0, 0.0], [xy, ly, 0.0], [xz, yz, lz]])
+
+def extract_lammps_results(lmp, elements, eatom_compute='eatom'):
+    """
+    Pull the last evaluated state out of a LAMMPs instance: PotEng, box, and per-atom
+    types, positions, forces and (if the compute exists) per-atom energies, ordered by atom ID.
+    """
+    natoms = lmp.get_natoms()
+    boxlo, boxhi, xy, yz, xz, _, _ = lmp.extract_box()
+    record = {
+        'energy': lmp.get_thermo('pe'),
+        'units': lmp.extract_global('units'),
+        'elements': elements,
+        'cell': box_to_cell(boxlo, boxhi, xy, yz, xz),
+        'origin': np.asarray(boxlo),
+        'types': np.array(lmp.gather_atoms('type', 0, 1)),
+        'positions': np.array(lmp.gather_atoms('x', 1, 3)).reshape(natoms, 3),
+        'forces': np.array(lmp.gather_atoms('f', 1, 3)).reshape(natoms, 3),
+    }
+    try:
+        record['eatom'] = np.array(lmp.gather(f'c_{eatom_compute}', 1, 1))
+    except Exception: # No per-atom energy compute in the input script
+        record['eatom'] = np.full(natoms, np.nan)
+    return record
+
+def save_npz(path, **arrays):
+    ''' np.savez through a temporary file, so readers never see a partial file '''
+    tmp_path = f'{path}.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+def partition_file(results_file, partition=0, n_partitions=1):
+    ''' Results file name for one partition of a multi-partition driver (results.part0.npz, ...) '''
+    if n_partitions <= 1:
+        return results_file
+    stem, ext = os.path.splitext(results_file)
+    return f'{stem}.part{partition}{ext}'
+
+def cached_file(results_file):
+    ''' Results file name for the structures the planner took from the evaluation cache (results.cached.npz) '''
+    stem, ext = os.path.splitext(results_file)
+    return f'{stem}.cached{ext}'
+
+def find_results_files(directory, results_file):
+    ''' Every results file (including per-partition and cached files) named results_file under directory '''
+    stem, ext = os.path.splitext(results_file)
+    paths = glob(os.path.join(directory, '**', results_file), recursive=True)
+    paths += glob(os.path.join(directory, '**', f'{stem}.part*{ext}'), recursive=True)
+    paths += glob(os.path.join(directory, '**', cached_file(results_file)), recursive=True)
+    return sorted(set(paths))
+
+class BatchResults:
+    """
+    Collects the results of every structure in a batch and writes them to one .npz file.
+
+    Per-atom arrays are concatenated with an `offsets` index; `run_paths` gives the
+    run path of each structure. Use load_results() to read the file back.
+    """
+    def __init__(self, results_path, root=True):
+        self.results_path = os.path.abspath(results_path)
+        self.root = root # Only the root rank of a LAMMPs instance keeps and writes results
+        self.records = {}
+        self.written = True
+
+    @classmethod
+    def from_env(cls, output_list, root=True, partition=0, n_partitions=1):
+        """
+        The BatchResults named by ENSEMBLEFFFIT_RESULTS_FILE, placed in the directory shared by
+        the batch's output paths, or None when the planner was not given --results_file.
+        Whatever was collected is also written at exit, so a failed structure does not lose
+        the rest of the batch.
+        """
+        results_file = os.environ.get(RESULTS_ENV)
+        if not results_file:
+            return None
+        results_dir = os.path.commonpath([os.path.abspath(p) for p in output_list])
+        results = cls(os.path.join(results_dir, partition_file(results_file, partition, n_partitions)), root=root)
+        atexit.register(results.write)
+        return results
+
+    def add(self, run_path, record):
+        if not self.root:
+            return
+        self.records[os.path.abspath(run_path)] = record
+        self.written = False
+
+    def write(self):
+        if self.written or not self.records:
+            return
+        run_paths = list(self.records)
+        records = [self.records[p] for p in run_paths]
+        natoms = [len(r['types']) for r in records]
+        arrays = {
+            'run_paths': np.array(run_paths),
+            'offsets': np.concatenate([[0], np.cumsum(natoms)]).astype(np.int64),
+            'energy': np.array([r['energy'] for r in records], dtype=float),
+            'units': np.array([r['units'] for r in records]),
+            'elements': np.array([r['elements'] for r in records]),
+            'cell': np.array([r['cell'] for r in records], dtype=float),
+            'origin': np.array([r['origin'] for r in records], dtype=float),
+        }
+        for key in PER_ATOM:
+            arrays[key] = np.concatenate([np.asarray(r[key]) for r in records])
+
+        save_npz(self.results_path, **arrays)
+        self.written = True
+
+def load_results(results_path):
+    """
+    Read a BatchResults file into {run_path: record} with the same keys the drivers stored,
+    plus 'symbols' from the element list and atom types.
+    """
+    results = {}
+    with np.load(results_path) as npz:
+        data = {key: npz[key] for key in npz.files}
+    offsets = data['offsets']
+    for i, run_path in enumerate(data['run_paths']):
+        record = {key: data[key][i] for key in ['energy', 'cell', 'origin']}
+        record['units'] = str(data['units'][i])
+        record['elements'] = str(data['elements'][i])
+        for key in PER_ATOM:
+            record[key] = data[key][offsets[i]:offsets[i+1]]
+        elements = record['elements'].split()
+        record['symbols'] = [elements[t-1] for t in record['types']]
+        results[str(run_path)] = record
+    return results
+
+def write_cached_results(records, results_file):
+    """
+    Write {run_path: record} taken from the evaluation cache to the cached results file in the
+    directory shared by the run paths, keeping the records of earlier rounds already in it.
+    """
+    if not records:
+        return None
+    results_dir = os.path.commonpath([os.path.abspath(p) for p in records])
+    os.makedirs(results_dir, exist_ok=True) # Cached tasks are not run, so a lone run path may not exist yet
+    results = BatchResults(os.path.join(results_dir, cached_file(results_file)))
+    if os.path.exists(results.results_path):
+        for run_path, record in load_results(results.results_path).items():
+            results.add(run_path, record)
+    for run_path, record in records.items():
+        results.add(run_path, record)
+    results.write()
+    return results.results_path
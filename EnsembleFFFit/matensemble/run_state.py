@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from glob import glob
+
+# Environment variable used to hand the database path from the planner to the drivers
+STATE_DB_ENV = 'ENSEMBLEFFFIT_STATE_DB'
+
+# Input labels that identify the force field of a task, in order of preference
+FFIELD_LABELS = ['ffield', 'foundation_model', 'init_FF']
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS batches (
+    batch_path      TEXT PRIMARY KEY,
+    task_command    TEXT,
+    n_tasks         INTEGER,
+    cpus_per_task   INTEGER,
+    gpus_per_task   INTEGER,
+    submitted_at    REAL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    run_path        TEXT PRIMARY KEY,
+    batch_path      TEXT REFERENCES batches(batch_path),
+    ffield          TEXT,
+    inputs          TEXT,
+    natoms          INTEGER,
+    status          TEXT NOT NULL DEFAULT 'planned',
+    planned_at      REAL,
+    submitted_at    REAL,
+    started_at      REAL,
+    finished_at     REAL,
+    elapsed         REAL,
+    output_dir      TEXT,
+    error           TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks(status);
+CREATE INDEX IF NOT EXISTS tasks_ffield ON tasks(ffield);
+CREATE INDEX IF NOT EXISTS tasks_batch ON tasks(batch_path);
+CREATE TABLE IF NOT EXISTS jobs (
+    jobid           INTEGER PRIMARY KEY,
+    workdir         TEXT,
+    submission_file TEXT,
+    dependency      TEXT,
+    status          TEXT,
+    submitted_at    REAL,
+    updated_at      REAL
+);
+'''
+
+class RunStateDB:
+    """
+    Indexed run state shared by the planners, the drivers and the queue monitor.
+
+    Task status moves planned -> submitted -> running -> done/failed. The default
+    rollback journal is used (not WAL) so the file can live on a parallel filesystem;
+    concurrent writers wait up to `timeout` seconds for the lock.
+    """
+    def __init__(self, db_path, timeout=120):
+        self.db_path = os.path.abspath(db_path)
+        self.conn = sqlite3.connect(self.db_path, timeout=timeout)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # ---------------- Planner ----------------
+    def record_plan(self, state_tasks, task_command=None, run_tasks=None,
+                    cpus_per_task=None, gpus_per_task=None, status='submitted'):
+        """
+        state_tasks: list of (run_path, batch_path, {label: input_path}) for every unbatched task.
+        Re-planning a task resets it to `status` unless it is already done.
+        """
+        now = time.time()
+        batch_sizes = {}
+        for _, batch_path, _ in state_tasks:
+            batch_sizes[batch_path] = batch_sizes.get(batch_path, 0) + 1
+
+        with self.conn:
+            self.conn.executemany(
+                '''INSERT INTO batches (batch_path, task_command, n_tasks, cpus_per_task, gpus_per_task, submitted_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(batch_path) DO UPDATE SET task_command=excluded.task_command, n_tasks=excluded.n_tasks,
+                   cpus_per_task=excluded.cpus_per_task, gpus_per_task=excluded.gpus_per_task, submitted_at=excluded.submitted_at''',
+                [(batch_path, task_command, n, cpus_per_task, gpus_per_task, now) for batch_path, n in batch_sizes.items()])
+            self.conn.executemany(
+                '''INSERT INTO tasks (run_path, batch_path, ffield, inputs, status, planned_at, submitted_at, output_dir)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(run_path) DO UPDATE SET batch_path=excluded.batch_path, ffield=excluded.ffield,
+                   inputs=excluded.inputs, submitted_at=excluded.submitted_at,
+                   status=CASE WHEN tasks.status='done' THEN tasks.status ELSE excluded.status END''',
+                [(run_path, batch_path, get_ffield(inputs), json.dumps(inputs), status, now,
+                  now if status == 'submitted' else None, run_path)
+                 for run_path, batch_path, inputs in state_tasks])
+
+    def done_run_paths(self):
+        return set(row['run_path'] for row in self.conn.execute("SELECT run_path FROM tasks WHERE status='done'"))
+
+    def sync_finished(self, finished_file):
+        """
+        Mark tasks done whose output directory contains finished_file (a glob pattern);
+        a one-off filesystem pass for tasks that ran without the drivers reporting.
+        """
+        rows = self.conn.execute("SELECT run_path, output_dir FROM tasks WHERE status!='done'").fetchall()
+        done = []
+        for row in rows:
+            matches = glob(os.path.join(row['output_dir'], finished_file))
+            if matches:
+                done.append((max(os.path.getmtime(m) for m in matches), row['run_path']))
+        with self.conn:
+            self.conn.executemany("UPDATE tasks SET status='done', finished_at=? WHERE run_path=?", done)
+        return len(done)
+
+    # ---------------- Executor ----------------
+    def start_task(self, run_path):
+        with self.conn:
+            self.conn.execute('''INSERT INTO tasks (run_path, status, started_at, output_dir) VALUES (?, 'running', ?, ?)
+                                 ON CONFLICT(run_path) DO UPDATE SET status='running', started_at=excluded.started_at,
+                                 error=NULL''', (run_path, time.time(), run_path))
+
+    def finish_task(self, run_path, status='done', error=None):
+        now = time.time()
+        with self.conn:
+            self.conn.execute('''UPDATE tasks SET status=?, finished_at=?, error=?,
+                                 elapsed=CASE WHEN started_at IS NULL THEN NULL ELSE ? - started_at END
+                                 WHERE run_path=?''', (status, now, error, now, run_path))
+
+    def set_natoms(self, natoms_by_run_path):
+        with self.conn:
+            self.conn.executemany('UPDATE tasks SET natoms=? WHERE run_path=?',
+                                  [(int(n), p) for p, n in natoms_by_run_path.items()])
+
+    # ---------------- Monitor ----------------
+    def record_job(self, jobid, workdir, submission_file, dependency=None, status='submitted'):
+        now = time.time()
+        with self.conn:
+            self.conn.execute('''INSERT OR REPLACE INTO jobs (jobid, workdir, submission_file, dependency, status, submitted_at, updated_at)
+                                 VALUES (?, ?, ?, ?, ?, ?, ?)''', (jobid, os.path.abspath(workdir), submission_file, dependency, status, now, now))
+
+    def update_job(self, jobid, status):
+        with self.conn:
+            self.conn.execute('UPDATE jobs SET status=?, updated_at=? WHERE jobid=?', (status, time.time(), jobid))
+
+    # ---------------- Queries ----------------
+    def status_counts(self):
+        return {row['status']: row['n'] for row in
+                self.conn.execute('SELECT status, COUNT(*) AS n FROM tasks GROUP BY status ORDER BY status')}
+
+    def remaining(self, under=None):
+        query = "SELECT run_path, status FROM tasks WHERE status!='done'"
+        params = ()
+        if under is not None:
+            query += ' AND run_path LIKE ?'
+            params = (os.path.join(os.path.abspath(under), '%'),)
+        return [(row['run_path'], row['status']) for row in self.conn.execute(query + ' ORDER BY run_path', params)]
+
+    def output_dirs(self, under=None, status='done'):
+        query = 'SELECT output_dir FROM tasks WHERE status=?'
+        params = (status,)
+        if under is not None:
+            query += ' AND output_dir LIKE ?'
+            params = (status, os.path.join(os.path.abspath(under), '%'))
+        return [row['output_dir'] for row in self.conn.execute(query, params)]
+
+    def slowest_ffields(self, limit=10):
+        return [tuple(row) for row in self.conn.execute(
+            '''SELECT ffield, COUNT(*) AS n, AVG(elapsed) AS mean_s, MAX(elapsed) AS max_s FROM tasks
+               WHERE elapsed IS NOT NULL GROUP BY ffield ORDER BY mean_s DESC LIMIT ?''', (limit,))]
+
+def get_ffield(inputs):
+    for label in FFIELD_LABELS:
+        if label in inputs:
+            return inputs[label]
+    return None
+
+def open_from_env():
+    ''' The RunStateDB named by ENSEMBLEFFFIT_STATE_DB, or None when drivers run without one '''
+    db_path = os.environ.get(STATE_DB_ENV)
+    if not db_path:
+        return None
+    return RunStateDB(db_path)
+
+@contextmanager
+def record_task(db, run_path):
+    """
+    Mark run_path running for the duration of the block, then done (or failed if it raised).
+    A no-op when db is None.
+    """
+    if db is None:
+        yield
+        return
+    db.start_task(run_path)
+    try:
+        yield
+    except BaseException as e:
+        db.finish_task(run_path, status='failed', error=f'{type(e).__name__}: {e}')
+        raise
+    db.finish_task(run_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or update a MatEnsemble run-state database")
+
+    parser.add_argument("--state_db", "-db", help="Path to the run-state SQLite database", default='run_state.db')
+    parser.add_argument("command", choices=['summary', 'remaining', 'slowest', 'sync'],
+                        help="summary: task counts by status; remaining: tasks not done; slowest: mean time per ffield; sync: mark tasks with --finished_file done")
+    parser.add_argument("--under", "-u", help="Restrict 'remaining' to run paths under this directory", default=None)
+    parser.add_argument("--finished_file", "-f", help="Glob pattern for the 'sync' command", default=None)
+    parser.add_argument("--limit", "-l", help="Rows shown for 'slowest'", type=int, default=10)
+
+    args = parser.parse_args()
+    db = RunStateDB(args.state_db)
+
+    if args.command == 'summary':
+        counts = db.status_counts()
+        for status, n in counts.items():
+            print(f'{status}: {n}')
+        print(f'total: {sum(counts.values())}')
+    elif args.command == 'remaining':
+        rows = db.remaining(args.under)
+        for run_path, status in rows:
+            print(f'{status}\t{run_path}')
+        print(f'{len(rows)} tasks remaining')
+    elif args.command == 'slowest':
+        for ffield, n, mean_s, max_s in db.slowest_ffields(args.limit):
+            print(f'{ffield}: n={n}, mean={mean_s:.1f} s, max={max_s:.1f} s')
+    elif args.command == 'sync':
+        if args.finished_file is None:
+            parser.error("'sync' needs --finished_file")
+        print(f'Marked {db.sync_finished(args.finished_file)} tasks done')
+    db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from glob import glob
+import yaml
+from EnsembleFFFit.matensemble.in_queue import submit_and_get_id
+from EnsembleFFFit.matensemble.in_queue import check_job
+
+# sacct states that mean a stage has to be submitted again
+FAILED_STATES = ['FAILED', 'CANCELLED', 'TIMEOUT', 'NODE_FAIL', 'OUT_OF_MEMORY', 'PREEMPTED', 'BOOT_FAIL', 'DEADLINE']
+
+def main():
+    parser = argparse.ArgumentParser(description="Submit a multi-stage campaign as a chain of SLURM dependencies")
+
+    parser.add_argument("--spec", "-s", help="Path to a .yml file describing the campaign stages", required=True)
+    parser.add_argument("--state_file", "-sf", help="JSON file recording job IDs and input hashes per stage; defaults to the spec's state_file",
+                        default=None)
+    parser.add_argument("--max_retries", "-mr", help="Maximum resubmissions of a failed stage", type=int, default=3)
+    parser.add_argument("--force", "-f", nargs='+', help="Stage names to resubmit even if complete (their dependents follow)", default=[])
+    parser.add_argument("--status", action='store_true', help="Only print the state of each stage")
+    parser.add_argument("--dry_run", "-dry", help="Only print what would be submitted", action='store_true')
+
+    args = parser.parse_args()
+    run_stage_graph(args)
+
+def load_yaml(yaml_path):
+    with open(yaml_path, 'r') as load_file:
+        yaml_data = yaml.safe_load(load_file)
+    return yaml_data
+
+def load_state(state_file):
+    if os.path.exists(state_file):
+        with open(state_file) as fh:
+            return json.load(fh)
+    return {}
+
+def save_state(state, state_file):
+    tmp_file = f'{state_file}.tmp'
+    with open(tmp_file, 'w') as fh:
+        json.dump(state, fh, indent=4)
+    os.replace(tmp_file, state_file)
+
+def topological_order(stages):
+    """
+    Order the stage dictionaries so every stage comes after its depends_on entries.
+    """
+    by_name = {stage['name']: stage for stage in stages}
+    ordered, visiting, done = [], set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f'Cycle in stage dependencies at {name}')
+        if name not in by_name:
+            raise ValueError(f'Unknown stage {name} in depends_on')
+        visiting.add(name)
+        for dep in by_name[name].get('depends_on', []):
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+        ordered.append(by_name[name])
+
+    for stage in stages:
+        visit(stage['name'])
+    return ordered
+
+def match_patterns(workdir, patterns):
+    paths = []
+    for pattern in patterns:
+        paths.extend(glob(os.path.join(workdir, pattern), recursive=True))
+    return sorted(set(p for p in paths if os.path.isfile(p)))
+
+def hash_inputs(workdir, patterns, submission_file):
+    """
+    Content hash of the submission file and every file matched by the input globs.
+    """
+    sha = hashlib.sha256()
+    for path in [os.path.join(workdir, submission_file)] + match_patterns(workdir, patterns):
+        if not os.path.isfile(path):
+            continue
+        sha.update(os.path.relpath(path, workdir).encode())
+        with open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b''):
+                sha.update(chunk)
+    return sha.hexdigest()
+
+def outputs_present(workdir, patterns):
+    ''' Every output glob must match at least one file '''
+    if not patterns:
+        return False
+    return all(match_patterns(workdir, [pattern]) for pattern in patterns)
+
+def job_state(jobid):
+    """
+    Ask sacct for the state of jobid; returns e.g. 'COMPLETED', 'RUNNING' or None if unavailable.
+    """
+    try:
+        sa = subprocess.run(["sacct", "-j", str(jobid), "-n", "-X", "-P", "-o", "State"],
+                            capture_output=True, text=True)
+    except FileNotFoundError:
+        return None
+    lines = [line.strip() for line in sa.stdout.splitlines() if line.strip()]
+    if not lines:
+        return None
+    return lines[0].split()[0]
+
+def stage_status(stage, record):
+    """
+    Classify a stage as 'complete', 'queued', 'failed' or 'new' from its recorded job,
+    sentinel files and outputs.
+    """
+    workdir = stage['workdir']
+    input_hash = hash_inputs(workdir, stage.get('inputs', []), stage['submission_file'])
+    have_outputs = outputs_present(workdir, stage.get('outputs', []))
+    jobid = record.get('jobid')
+
+    if jobid is None:
+        # Outputs produced outside the runner are adopted once, then tracked by hash
+        if have_outputs and record.get('input_hash') in (None, input_hash):
+            return 'complete', input_hash
+        return 'new', input_hash
+
+    in_queue, done_flag, fail_flag, _ = check_job(jobid, workdir)
+    state = job_state(jobid)
+    if in_queue or state in ['PENDING', 'RUNNING', 'REQUEUED', 'SUSPENDED', 'CONFIGURING']:
+        return 'queued', input_hash
+    if fail_flag or state in FAILED_STATES:
+        return 'failed', input_hash
+    if have_outputs and (done_flag or state == 'COMPLETED' or state is None):
+        if record.get('input_hash') in (None, input_hash):
+            return 'complete', input_hash
+        return 'new', input_hash # inputs changed since the outputs were written
+    return 'failed', input_hash
+
+def run_stage_graph(args):
+    spec = load_yaml(args.spec)
+    spec_dir = os.path.dirname(os.path.abspath(args.spec))
+    state_file = args.state_file or os.path.join(spec_dir, spec.get('state_file', 'stage_state.json'))
+    state = load_state(state_file)
+
+    stages = topological_order(spec['stages'])
+    for stage in stages:
+        stage['workdir'] = os.path.abspath(os.path.join(spec_dir, stage.get('workdir', stage['name'])))
+        stage.setdefault('submission_file', 'submit.sh')
+
+    resubmitted, failed = set(), set()
+    for stage in stages:
+        name = stage['name']
+        record = state.setdefault(name, {'jobid': None, 'input_hash': None, 'retries': 0})
+        status, input_hash = stage_status(stage, record)
+        if status == 'failed':
+            failed.add(name)
+
+        # A stage is stale if anything upstream is being run again
+        upstream = stage.get('depends_on', [])
+        if name in args.force or any(dep in resubmitted for dep in upstream):
+            status = 'new' if status != 'queued' else status
+
+        if status == 'complete':
+            record['status'] = 'complete'
+            record['input_hash'] = input_hash
+            print(f"[{name}] complete (job {record['jobid']}); skipping")
+            continue
+
+        if status == 'queued':
+            record['status'] = 'queued'
+            resubmitted.add(name)
+            print(f"[{name}] job {record['jobid']} still queued")
+            continue
+
+        if args.status:
+            print(f"[{name}] {status}")
+            continue
+
+        # A job cancelled by --kill-on-invalid-dep because an upstream stage failed is not a retry of its own
+        if status == 'failed' and not (any(dep in failed for dep in upstream) and job_state(record['jobid']) == 'CANCELLED'):
+            retries = record.get('retries', 0) + 1
+            if retries > args.max_retries:
+                print(f"[{name}] failed {retries - 1} times; giving up on this stage and its dependents")
+                if not args.dry_run:
+                    record['retries'] = retries
+                    save_state(state, state_file)
+                sys.exit(1)
+            if not args.dry_run:
+                record['retries'] = retries
+
+        # Chain to upstream jobs that have not finished yet
+        dep_ids = [str(state[dep]['jobid']) for dep in upstream
+                   if dep in resubmitted and state[dep].get('jobid') is not None]
+        dependency = f"afterok:{':'.join(dep_ids)}" if dep_ids else None
+
+        if args.dry_run:
+            print(f"[{name}] {status}; would submit {stage['submission_file']} in {stage['workdir']} (dependency={dependency})")
+            resubmitted.add(name)
+            continue
+
+        jobid = submit_and_get_id(stage['workdir'], stage['submission_file'], dependency=dependency)
+        if jobid is None:
+            save_state(state, state_file)
+            sys.exit(1)
+        print(f"[{name}] submitted job {jobid} (dependency={dependency})")
+        record.update({'jobid': jobid, 'input_hash': input_hash, 'status': 'queued'}) # Completion is checked against these inputs
+        resubmitted.add(name)
+        save_state(state, state_file)
+
+    if not args.dry_run:
+        save_state(state, state_file)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# Node-local staging of the inputs shared by many tasks (ffield, control, input scripts,
+# MACE models). The first task on a node copies each file from the shared filesystem into
+# the stage directory; every later task on that node reads the local copy. Copies are
+# stored by content hash, so the same ffield copied into many run directories is kept once.
+
+# Environment variable used to hand the stage directory from the planner to the drivers
+STAGE_ENV = 'ENSEMBLEFFFIT_STAGE_DIR'
+
+def resolve_stage_dir(stage_dir):
+    ''' 'tmp' means a directory under the system temp dir (e.g. on a single machine) '''
+    if stage_dir == 'tmp':
+        return os.path.join(tempfile.gettempdir(), 'ensemblefffit_stage')
+    return stage_dir
+
+@contextmanager
+def file_lock(lock_path):
+    ''' Exclusive lock shared by every process on the node '''
+    with open(lock_path, 'a') as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+def copy_and_hash(src, dst, chunk_size=1 << 22):
+    ''' Copy src to dst and return the sha256 of the bytes copied '''
+    digest = hashlib.sha256()
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        for chunk in iter(lambda: fin.read(chunk_size), b''):
+            digest.update(chunk)
+            fout.write(chunk)
+    shutil.copystat(src, dst)
+    return digest.hexdigest()
+
+def stage_file(path, stage_dir=None):
+    """
+    The node-local copy of path, copying it on first use. The copy is looked up by
+    (absolute path, size, mtime), so a changed source is staged again, and stored under
+    its content hash. Returns path unchanged when staging is off (no stage_dir and no
+    ENSEMBLEFFFIT_STAGE_DIR) or path is not a file.
+    """
+    stage_dir = resolve_stage_dir(stage_dir or os.environ.get(STAGE_ENV))
+    if not stage_dir or not path or not os.path.isfile(path):
+        return path
+
+    stat = os.stat(path)
+    key = hashlib.sha1(f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()
+    index_dir, objects_dir = os.path.join(stage_dir, 'index'), os.path.join(stage_dir, 'objects')
+    os.makedirs(index_dir, exist_ok=True)
+    os.makedirs(objects_dir, exist_ok=True)
+    index = os.path.join(index_dir, key)
+
+    with file_lock(f'{index}.lock'): # One copy per file per node, however many tasks start at once
+        if os.path.exists(index):
+            with open(index) as fh:
+                local = fh.read().strip()
+            if os.path.exists(local):
+                return local
+
+        fd, tmp = tempfile.mkstemp(dir=objects_dir, prefix='.staging.')
+        os.close(fd)
+        try:
+            content_hash = copy_and_hash(path, tmp)
+            local_dir = os.path.join(objects_dir, content_hash)
+            local = os.path.join(local_dir, os.path.basename(path)) # Keep the name; drivers may rely on the extension
+            os.makedirs(local_dir, exist_ok=True)
+            if os.path.exists(local):
+                os.remove(tmp)
+            else:
+                os.replace(tmp, local)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        with open(f'{index}.tmp', 'w') as fh:
+            fh.write(local)
+        os.replace(f'{index}.tmp', index)
+    return local
+
+def stage_lists(*path_lists, stage_dir=None):
+    ''' The task lists with every shared input replaced by its local copy; each unique path is staged once '''
+    staged = {path: stage_file(path, stage_dir) for path in set(p for paths in path_lists for p in paths)}
+    return [[staged[path] for path in paths] for paths in path_lists]
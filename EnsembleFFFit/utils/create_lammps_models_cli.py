@@ -1,17 +1,29 @@
 # pylint: disable=wrong-import-position
 import argparse
 import copy
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 os.environ["TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD"] = "1"
 
 import torch
+from ase.io import read
 from e3nn.util import jit
 
-from mace.calculators import LAMMPS_MACE
+from mace.calculators import LAMMPS_MACE, MACECalculator
 from mace.calculators.lammps_mliap_mace import LAMMPS_MLIAP_MACE
 from mace.cli.convert_e3nn_cueq import run as run_e3nn_to_cueq
 
+from EnsembleFFFit.matensemble.precision import validate_fast_mode
+from EnsembleFFFit.matensemble.model_manifest import (
+    MANIFEST,
+    is_current,
+    read_manifest,
+    source_entry,
+    write_manifest,
+)
+
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -47,10 +59,48 @@ def parse_args():
         help="Old libtorch format, or new mliap format",
         default="mliap",
     )
+    parser.add_argument(
+        "--validate_structures",
+        type=str,
+        nargs="*",
+        help="Structure files on which a float32 model must match float64 before it is written "
+        "in float32 (float64 is written otherwise); float32 is written unchecked if none are given",
+        default=[],
+    )
+    parser.add_argument(
+        "--energy_tol",
+        type=float,
+        help="Largest accepted float32 energy difference from float64 (eV/atom)",
+        default=1e-3,
+    )
+    parser.add_argument(
+        "--force_tol",
+        type=float,
+        help="Largest accepted float32 force component difference from float64 (eV/A)",
+        default=1e-2,
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Models converted in parallel on the CPU, each in its own process",
+        default=1,
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        help="Manifest of converted models; models already converted from the same contents "
+        "with the same settings are skipped (default: lammps_models.json in --models_path)",
+        default=None,
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Convert every model, even if the manifest lists it as current",
+    )
     return parser.parse_args()
 
 
-def select_head(model):
+def select_head(model, interactive=True):
     if hasattr(model, "heads"):
         heads = model.heads
     else:
@@ -60,6 +110,10 @@ def select_head(model):
         print(f"Only one head found in the model: {heads[0]}. Skipping selection.")
         return heads[0]
 
+    if not interactive:
+        print(f"Heads {heads} found; pass --head to select one. Proceeding without specifying a head.")
+        return None
+
     print("Available heads in the model:")
     for i, head in enumerate(heads):
         print(f"{i + 1}: {head}")
@@ -78,47 +132,136 @@ def select_head(model):
     return heads[-1]
 
 
+def find_models(models_path, model_name):
+    """(source model, output path) for every model named model_name under models_path"""
+    base_name = model_name.split(".", 1)[0]
+    models = []
+    for root, _, _ in os.walk(models_path):
+        source = os.path.join(root, model_name)
+        if os.path.exists(source):
+            models.append((os.path.abspath(source), os.path.abspath(os.path.join(root, base_name))))
+    return models
+
+
+def output_path(base_path, fmt):
+    return base_path + ("-mliap.pt" if fmt == "mliap" else ".pt")
+
+
+def convert_model(source, output, settings, interactive=True):
+    """Convert one MACE model for LAMMPS; returns the dtype and head actually used"""
+    print(f"Creating {settings['format']} model for {source}")
+    model = torch.load(source, map_location="cpu")
+    dtype = settings["dtype"]
+    if dtype == "float32" and settings["validate_structures"]:
+        # Each calculator converts its own copy of the model
+        dtype, _ = validate_fast_mode(
+            lambda precision, compile: MACECalculator(
+                models=copy.deepcopy(model), device="cpu", default_dtype=precision
+            ),
+            [read(path) for path in settings["validate_structures"]],
+            precision="float32",
+            energy_tol=settings["energy_tol"],
+            force_tol=settings["force_tol"],
+        )
+
+    if dtype == "float64":
+        model = model.double().to("cpu")
+    elif dtype == "float32":
+        print("Converting model to float32, this may cause loss of precision.")
+        model = model.float().to("cpu")
+
+    if settings["format"] == "mliap":
+        # Enabling cuequivariance by default. TODO: switch?
+        model = run_e3nn_to_cueq(copy.deepcopy(model))
+        model.lammps_mliap = True
+
+    if settings["head"] is None:
+        head = select_head(model, interactive=interactive)
+    else:
+        head = settings["head"]
+        print(
+            f"Selected head: {head} from command line in the list available heads: {model.heads}"
+        )
+
+    lammps_class = LAMMPS_MLIAP_MACE if settings["format"] == "mliap" else LAMMPS_MACE
+    lammps_model = (
+        lammps_class(model, head=head) if head is not None else lammps_class(model)
+    )
+    # Written under a temporary name, so a killed conversion never leaves a partial model
+    tmp_output = f"{output}.tmp"
+    if settings["format"] == "mliap":
+        torch.save(lammps_model, tmp_output)
+    else:
+        lammps_model_compiled = jit.compile(lammps_model)
+        lammps_model_compiled.save(tmp_output)
+    os.replace(tmp_output, output)
+    return {"dtype": dtype, "head": head}
+
+
+def init_worker(threads):
+    torch.set_num_threads(threads)
+
+
 def main():
     args = parse_args()
-    model_path = args.models_path  # takes model name as command-line input
-    check_name = args.model_name
-    base_name = check_name.split('.', 1)[0]
-    for root, _, _ in os.walk(model_path):
-        check_model_path = os.path.join(root, check_name)
-        if os.path.exists(check_model_path):
-            print(f"Creating {args.format} model for {check_model_path}")
-            model = torch.load(
-            check_model_path,
-            map_location=torch.device("cuda" if torch.cuda.is_available() else "cpu"),
-            )
-            if args.dtype == "float64":
-                model = model.double().to("cpu")
-            elif args.dtype == "float32":
-                print("Converting model to float32, this may cause loss of precision.")
-                model = model.float().to("cpu")
-
-            if args.format == "mliap":
-                # Enabling cuequivariance by default. TODO: switch?
-                model = run_e3nn_to_cueq(copy.deepcopy(model))
-                model.lammps_mliap = True
-
-            if args.head is None:
-                head = select_head(model)
-            else:
-                head = args.head
-                print(
-                    f"Selected head: {head} from command line in the list available heads: {model.heads}"
-                )
-
-            lammps_class = LAMMPS_MLIAP_MACE if args.format == "mliap" else LAMMPS_MACE
-            lammps_model = (
-                lammps_class(model, head=head) if head is not None else lammps_class(model)
-            )
-            if args.format == "mliap":
-                torch.save(lammps_model, os.path.join(root, base_name + "-mliap.pt"))
-            else:
-                lammps_model_compiled = jit.compile(lammps_model)
-                lammps_model_compiled.save(os.path.join(root, base_name + ".pt"))
+    settings = {
+        "format": args.format,
+        "dtype": args.dtype,
+        "head": args.head,
+        "validate_structures": [os.path.abspath(path) for path in args.validate_structures],
+        "energy_tol": args.energy_tol,
+        "force_tol": args.force_tol,
+    }
+    manifest_path = args.manifest or os.path.join(args.models_path, MANIFEST)
+    manifest = read_manifest(manifest_path)
+
+    # Skip models converted before from the same contents with the same settings
+    pending, n_current = [], 0
+    for source, base_path in find_models(args.models_path, args.model_name):
+        output = output_path(base_path, args.format)
+        if not args.force and is_current(manifest.get(source), source, settings):
+            manifest[source].update(source_entry(source)) # Record a touched but unchanged source
+            n_current += 1
+            continue
+        pending.append((source, output))
+    print(f"{len(pending)} models to convert; {n_current} up to date")
+
+    def record(source, output, used):
+        manifest[source] = {**source_entry(source), "output": output, "settings": settings, **used}
+        write_manifest(manifest_path, manifest) # After each model, so an interrupted batch keeps its progress
+
+    failed = []
+    if args.workers > 1 and len(pending) > 1:
+        # spawn: every worker starts with a fresh torch rather than a fork of this process
+        workers = min(args.workers, len(pending))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(max(1, (os.cpu_count() or 1) // workers),),
+        ) as pool:
+            futures = {
+                pool.submit(convert_model, source, output, settings, False): (source, output)
+                for source, output in pending
+            }
+            for future in as_completed(futures):
+                source, output = futures[future]
+                try:
+                    record(source, output, future.result())
+                except Exception as e:
+                    print(f"Conversion of {source} failed: {e}")
+                    failed.append(source)
+    else:
+        for source, output in pending:
+            try:
+                record(source, output, convert_model(source, output, settings))
+            except Exception as e:
+                print(f"Conversion of {source} failed: {e}")
+                failed.append(source)
+
+    print(f"Converted {len(pending) - len(failed)} models; manifest written to {manifest_path}")
+    if failed:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
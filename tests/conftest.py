@@ -0,0 +1,46 @@
+import pytest
+
+# Small LAMMPs data files and ReaxFF ffield headers shared by the tests. Atom type 1 is Se
+# and type 2 is Bi, so type order differs from alphabetical order.
+
+SE, BI = 78.96, 208.9804
+
+def lammps_data(positions, types, masses={1: SE, 2: BI}, labels={1: 'Se', 2: 'Bi'}, box=6.0, charges=None):
+    ''' Text of a charge-style LAMMPs data file; labels are written as Masses comments when given '''
+    charges = charges if charges is not None else [0.0] * len(positions)
+    lines = ['Test structure', '', f'{len(positions)} atoms', f'{len(masses)} atom types', '',
+             f'0.0 {box} xlo xhi', f'0.0 {box} ylo yhi', f'0.0 {box} zlo zhi', '', 'Masses', '']
+    for t, mass in sorted(masses.items()):
+        lines.append(f'{t} {mass}' + (f' # {labels[t]}' if labels and t in labels else ''))
+    lines += ['', 'Atoms # charge', '']
+    for i, ((x, y, z), t, q) in enumerate(zip(positions, types, charges)):
+        lines.append(f'{i + 1} {t} {q} {x} {y} {z}')
+    return '\n'.join(lines) + '\n'
+
+def ffield_text(elements):
+    ''' A ReaxFF ffield with one general parameter and only the atom section filled in '''
+    lines = ['Reactive MD-force field', '1 ! Number of general parameters', '50.0 !Overcoordination parameter',
+             f'{len(elements)} ! Nr of atoms; cov.r; valency;a.m;Rvdw;Evdw;gammaEEM;cov.r2;#',
+             'alfa;gammavdW;valency;Evdw1;Rcore2;Ecore2;Acore2', 'cov r3;Elp;Heat inc.;n.u.;n.u.;n.u.;n.u.',
+             'ov/un;val1;n.u.;val3,vval4']
+    for element in elements:
+        lines += [f' {element} 1.0 2.0 3.0', '  1.0 2.0', '  1.0 2.0', '  1.0 2.0']
+    lines += ['0 ! Nr of bonds']
+    return '\n'.join(lines) + '\n'
+
+@pytest.fixture
+def data_file(tmp_path):
+    ''' data_file(name, positions, types, **kwargs) writes a LAMMPs data file and returns its path '''
+    def write(name, positions, types, **kwargs):
+        path = tmp_path / name
+        path.write_text(lammps_data(positions, types, **kwargs))
+        return str(path)
+    return write
+
+@pytest.fixture
+def ffield_file(tmp_path):
+    def write(name, elements):
+        path = tmp_path / name
+        path.write_text(ffield_text(elements))
+        return str(path)
+    return write
@@ -0,0 +1,78 @@
+import os
+import numpy as np
+from EnsembleFFFit.matensemble.base import LammpsMatEnsemble
+from EnsembleFFFit.matensemble.eval_cache import CACHE_ENV, EvalCache, eval_key
+from EnsembleFFFit.matensemble.results import load_results, write_cached_results
+from EnsembleFFFit.matensemble.run_state import RunStateDB
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+def record(energy, natoms=2):
+    return {'energy': energy, 'units': 'real', 'elements': 'Se Bi', 'cell': np.eye(3), 'origin': np.zeros(3),
+            'types': np.array([1, 2] * (natoms // 2)), 'positions': np.ones((natoms, 3)),
+            'forces': np.full((natoms, 3), energy), 'eatom': np.zeros(natoms)}
+
+def test_put_get_round_trip(tmp_path):
+    cache = EvalCache(str(tmp_path / 'cache'))
+    assert cache.get('ab' * 32) is None
+
+    cache.put('ab' * 32, record(-1.5))
+    cached = cache.get('ab' * 32)
+    assert 'ab' * 32 in cache
+    assert cached['energy'] == -1.5 and cached['units'] == 'real' and cached['elements'] == 'Se Bi'
+    np.testing.assert_array_equal(cached['forces'], record(-1.5)['forces'])
+    assert (cache.n_hits, cache.n_misses) == (1, 1)
+    assert not [name for name in os.listdir(os.path.dirname(cache.path('ab' * 32))) if name.startswith('.tmp.')]
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = EvalCache(str(tmp_path / 'cache'))
+    os.makedirs(os.path.dirname(cache.path('cd' * 32)))
+    with open(cache.path('cd' * 32), 'wb') as fh:
+        fh.write(b'left by a killed writer')
+    assert cache.get('cd' * 32) is None
+
+def test_key_follows_contents_not_paths(tmp_path):
+    ffield = write(tmp_path / 'ffield', 'ff')
+    copy = write(tmp_path / 'ffield_copy', 'ff')
+    struct = write(tmp_path / 's.lmp', 'structure')
+    inp = write(tmp_path / 'in.sp', 'run 0')
+
+    key = eval_key(ffield, struct, [inp], elements='Se Bi')
+    assert eval_key(copy, struct, [inp], elements='Se Bi') == key
+    assert eval_key(ffield, struct, [inp], elements='Bi Se') != key
+    assert eval_key(ffield, struct, [inp, None], elements='Se Bi') != key
+
+    write(tmp_path / 'ffield', 'refit ff')
+    os.utime(ffield, ns=(0, os.stat(ffield).st_mtime_ns + 10**9))
+    assert eval_key(ffield, struct, [inp], elements='Se Bi') != key
+
+def test_from_env(tmp_path, monkeypatch):
+    monkeypatch.delenv(CACHE_ENV, raising=False)
+    assert EvalCache.from_env() is None
+    monkeypatch.setenv(CACHE_ENV, str(tmp_path / 'cache'))
+    assert EvalCache.from_env().root == str(tmp_path / 'cache')
+
+def test_cached_results_file(tmp_path):
+    first, second = str(tmp_path / 'batch' / 'a'), str(tmp_path / 'batch' / 'b')
+
+    # One cached task writes next to its own (never created) run directory
+    path = write_cached_results({first: record(-1.0)}, 'results.npz')
+    assert path == os.path.join(first, 'results.cached.npz')
+
+    # Later rounds merge with the records already in the file
+    path = write_cached_results({first: record(-1.0), second: record(-2.0)}, 'results.npz')
+    write_cached_results({first: record(-3.0), second: record(-2.0)}, 'results.npz')
+    assert {run_path: rec['energy'] for run_path, rec in load_results(path).items()} == {first: -3.0, second: -2.0}
+    assert write_cached_results({}, 'results.npz') is None
+
+def test_record_cached_results(tmp_path):
+    run_path, state_db = str(tmp_path / 'batch' / 'a'), str(tmp_path / 'state.db')
+    job = LammpsMatEnsemble(str(tmp_path), str(tmp_path))
+    job.record_cached_results({run_path: record(-1.0)}, [(run_path, run_path, {'ffield': 'ffield'})], 'results.npz', state_db)
+
+    assert os.path.exists(os.path.join(run_path, 'results.cached.npz'))
+    db = RunStateDB(state_db)
+    assert db.done_run_paths() == {run_path}
+    db.close()
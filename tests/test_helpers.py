@@ -0,0 +1,32 @@
+import os
+from EnsembleFFFit.matensemble.lammps.helpers import get_elements, parse_list, read_masses_elements, read_natoms
+
+POSITIONS = [(0.0, 0.0, 0.0), (2.0, 2.0, 2.0), (4.0, 4.0, 4.0)]
+
+def test_elements_in_type_order(data_file):
+    # Type 1 is Se: the pair_coeff list follows the type order, not alphabetical order
+    assert get_elements(data_file('s.lmp', POSITIONS, [1, 2, 2])) == 'Se Bi'
+
+def test_elements_from_masses(data_file):
+    path = data_file('s.lmp', POSITIONS, [1, 2, 2], masses={1: 208.9804, 2: 78.96}, labels=None)
+    assert read_masses_elements(path) == 'Bi Se'
+
+def test_comment_overrides_mass(data_file):
+    # The element in the comment wins over the closest mass (1.0 is H)
+    path = data_file('s.lmp', POSITIONS, [1, 2, 2], masses={1: 1.0, 2: 78.96}, labels={1: 'Bi', 2: 'Se'})
+    assert read_masses_elements(path) == 'Bi Se'
+
+def test_cache_follows_file_changes(data_file):
+    path = data_file('s.lmp', POSITIONS, [1, 2, 2])
+    assert get_elements(path) == 'Se Bi'
+    data_file('s.lmp', POSITIONS, [1, 2, 2], labels={1: 'Bi', 2: 'Se'})
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+    assert get_elements(path) == 'Bi Se'
+
+def test_read_natoms(data_file, tmp_path):
+    assert read_natoms(data_file('s.lmp', POSITIONS, [1, 2, 2])) == 3
+    assert read_natoms(str(tmp_path / 'missing.lmp')) == 1
+
+def test_parse_list():
+    assert parse_list("['a', 'b']") == ['a', 'b']
+    assert parse_list('a,b') == ['a', 'b']
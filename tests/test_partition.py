@@ -0,0 +1,36 @@
+import pytest
+from EnsembleFFFit.matensemble.lammps.partition import budget_batches, is_root, partition_share, split_partitions
+
+WEIGHTS = [120, 40, 300, 40, 80, 200, 10]
+
+def test_single_partition_takes_everything():
+    assert partition_share(WEIGHTS, 0, 1) == set(range(len(WEIGHTS)))
+
+@pytest.mark.parametrize('n_partitions', [2, 3, 7, 10])
+def test_partitions_cover_every_structure_once(n_partitions):
+    shares = [partition_share(WEIGHTS, p, n_partitions) for p in range(n_partitions)]
+    assert sorted(i for share in shares for i in share) == list(range(len(WEIGHTS)))
+
+def test_partitions_balance_weights():
+    loads = [sum(WEIGHTS[i] for i in partition_share(WEIGHTS, p, 2)) for p in range(2)]
+    assert sorted(loads) == [390, 400] # Largest first onto the least loaded partition
+
+def test_budget_batches_fit_budget():
+    batches = budget_batches(WEIGHTS, 300)
+    assert sorted(i for batch in batches for i in batch) == list(range(len(WEIGHTS)))
+    assert all(sum(WEIGHTS[i] for i in batch) <= 300 for batch in batches)
+    assert all(batch == sorted(batch) for batch in batches) # Input order kept within a sub-batch
+    assert len(batches) == 3
+
+def test_budget_batches_oversized_item():
+    assert budget_batches([500, 50, 60], 100) == [[0], [2], [1]] # Largest first
+
+def test_budget_batches_without_budget():
+    assert budget_batches(WEIGHTS, 0) == [list(range(len(WEIGHTS)))]
+    assert budget_batches([], 100) == []
+
+def test_no_partitions_without_partition_size():
+    # LAMMPs is not given a communicator, so a serial LAMMPs build works next to mpi4py
+    assert split_partitions(None) == (None, 0, 1)
+    assert split_partitions(4) == (None, 0, 1) # A single rank (or no mpi4py)
+    assert is_root(None)
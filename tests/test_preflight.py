@@ -0,0 +1,24 @@
+from EnsembleFFFit.matensemble.preflight import get_ffield_elements, preflight_tasks, read_structure_elements
+
+POSITIONS = [(0.0, 0.0, 0.0), (2.0, 2.0, 2.0)]
+
+def test_ffield_elements(ffield_file):
+    assert get_ffield_elements(ffield_file('ffield', ['Se', 'Bi'])) == ['Bi', 'Se']
+
+def test_structure_elements(data_file):
+    assert read_structure_elements(data_file('s.lmp', POSITIONS, [1, 2])) == ['Bi', 'Se']
+
+def test_preflight_excludes_bad_tasks(tmp_path, data_file, ffield_file):
+    both = ffield_file('ffield_bise', ['Bi', 'Se'])
+    se_only = ffield_file('ffield_se', ['Se'])
+    struct = data_file('s.lmp', POSITIONS, [1, 2])
+    missing = str(tmp_path / 'missing.lmp')
+
+    tasks = [[both, struct], [se_only, struct], [both, missing]]
+    good, good_paths, failures = preflight_tasks(tasks, ['ok', 'no_bi', 'missing'], ['ffield', 'structure'],
+                                                 structure_labels=['structure'], potential_label='ffield', workers=1)
+
+    assert good == [[both, struct]] and good_paths == ['ok']
+    reasons = dict(failures)
+    assert reasons['no_bi'] == [f"elements ['Bi'] not in ffield {se_only}"]
+    assert reasons['missing'] == [f'missing structure: {missing}']
@@ -0,0 +1,43 @@
+import os
+import numpy as np
+from EnsembleFFFit.matensemble.results import BatchResults, cached_file, find_results_files, load_results, partition_file
+
+def record(natoms, energy):
+    rng = np.random.default_rng(natoms)
+    return {'energy': energy, 'units': 'real', 'elements': 'Se Bi',
+            'cell': np.eye(3) * 6.0, 'origin': np.zeros(3),
+            'types': np.array([1, 2] * (natoms // 2)),
+            'positions': rng.random((natoms, 3)), 'forces': rng.random((natoms, 3)),
+            'eatom': rng.random(natoms)}
+
+def test_round_trip(tmp_path):
+    results = BatchResults(str(tmp_path / 'results.npz'))
+    records = {str(tmp_path / 'a'): record(2, -1.5), str(tmp_path / 'b'): record(4, -3.0)}
+    for run_path, rec in records.items():
+        results.add(run_path, rec)
+    results.write()
+
+    loaded = load_results(results.results_path)
+    assert list(loaded) == list(records)
+    for run_path, rec in records.items():
+        assert loaded[run_path]['energy'] == rec['energy']
+        assert loaded[run_path]['units'] == 'real'
+        for key in ['cell', 'types', 'positions', 'forces', 'eatom']:
+            np.testing.assert_array_equal(loaded[run_path][key], rec[key])
+    assert loaded[str(tmp_path / 'b')]['symbols'] == ['Se', 'Bi', 'Se', 'Bi']
+
+def test_non_root_rank_writes_nothing(tmp_path):
+    results = BatchResults(str(tmp_path / 'results.npz'), root=False)
+    results.add(str(tmp_path / 'a'), record(2, -1.0))
+    results.write()
+    assert not os.path.exists(results.results_path)
+
+def test_file_names(tmp_path):
+    assert partition_file('results.npz') == 'results.npz'
+    assert partition_file('results.npz', 1, 2) == 'results.part1.npz'
+    assert cached_file('results.npz') == 'results.cached.npz'
+
+    for name in ['results.npz', 'results.part0.npz', 'results.cached.npz', 'other.npz']:
+        (tmp_path / name).write_bytes(b'')
+    found = [os.path.basename(p) for p in find_results_files(str(tmp_path), 'results.npz')]
+    assert found == ['results.cached.npz', 'results.npz', 'results.part0.npz']
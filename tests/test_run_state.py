@@ -0,0 +1,69 @@
+import pytest
+from EnsembleFFFit.matensemble.run_state import RunStateDB, record_task
+
+@pytest.fixture
+def db(tmp_path):
+    db = RunStateDB(str(tmp_path / 'state.db'))
+    yield db
+    db.close()
+
+def plan(run_paths, batch_path='batch', ffield='ffield'):
+    return [(run_path, batch_path, {'ffield': ffield, 'structure': f'{run_path}.lmp'}) for run_path in run_paths]
+
+def status(db, run_path):
+    return db.conn.execute('SELECT status FROM tasks WHERE run_path=?', (run_path,)).fetchone()['status']
+
+def test_task_transitions(db):
+    db.record_plan(plan(['a', 'b']), task_command='run.py')
+    assert db.status_counts() == {'submitted': 2}
+
+    db.start_task('a')
+    assert status(db, 'a') == 'running'
+    db.finish_task('a')
+    assert db.done_run_paths() == {'a'}
+    assert db.conn.execute("SELECT elapsed FROM tasks WHERE run_path='a'").fetchone()['elapsed'] >= 0
+
+    # Planning again resets unfinished tasks but keeps done ones
+    db.start_task('b')
+    db.record_plan(plan(['a', 'b']))
+    assert status(db, 'a') == 'done' and status(db, 'b') == 'submitted'
+    assert db.remaining() == [('b', 'submitted')]
+
+def test_record_plan_as_done(db):
+    db.record_plan(plan(['cached']), status='done')
+    assert db.done_run_paths() == {'cached'}
+
+def test_record_task(db):
+    db.record_plan(plan(['ok', 'bad']))
+    with record_task(db, 'ok'):
+        assert status(db, 'ok') == 'running'
+    with pytest.raises(RuntimeError):
+        with record_task(db, 'bad'):
+            raise RuntimeError('lost atoms')
+
+    assert status(db, 'ok') == 'done'
+    row = db.conn.execute("SELECT status, error FROM tasks WHERE run_path='bad'").fetchone()
+    assert (row['status'], row['error']) == ('failed', 'RuntimeError: lost atoms')
+
+def test_record_task_without_db():
+    with record_task(None, 'anything'):
+        pass
+
+def test_sync_finished(db, tmp_path):
+    finished, unfinished = tmp_path / 'finished', tmp_path / 'unfinished'
+    for path in (finished, unfinished):
+        path.mkdir()
+    (finished / 'properties.json').write_text('{}')
+    db.record_plan(plan([str(finished), str(unfinished)]))
+
+    assert db.sync_finished('properties.json') == 1
+    assert db.done_run_paths() == {str(finished)}
+
+def test_natoms_and_slowest(db):
+    db.record_plan(plan(['a'], ffield='ff1') + plan(['b'], ffield='ff2'))
+    db.set_natoms({'a': 10, 'b': 20})
+    for run_path in ['a', 'b']:
+        db.start_task(run_path)
+        db.finish_task(run_path)
+    assert dict(db.conn.execute('SELECT run_path, natoms FROM tasks').fetchall()) == {'a': 10, 'b': 20}
+    assert sorted(row[0] for row in db.slowest_ffields()) == ['ff1', 'ff2']
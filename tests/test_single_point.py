@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from EnsembleFFFit.matensemble.lammps.single_point import (SinglePointRunner, force_field_commands, is_single_point,
+                                                           read_lammps_data, read_script_commands)
+
+SINGLE_POINT = '''units metal
+atom_style charge
+read_data ${structure} # the structure
+pair_style lj/cut &
+    5.0
+pair_coeff * * ${epsilon} 2.5
+thermo_style custom step pe
+run 0
+'''
+
+POSITIONS = [(0.0, 0.0, 0.0), (2.6, 0.0, 0.0), (0.0, 2.7, 0.0), (2.8, 2.8, 2.8)]
+TYPES = [1, 2, 1, 2]
+
+@pytest.fixture
+def script(tmp_path):
+    def write(text, name='in.sp'):
+        path = tmp_path / name
+        path.write_text(text)
+        return str(path)
+    return write
+
+def test_read_script_commands(script):
+    commands = read_script_commands(script(SINGLE_POINT))
+    assert commands[2] == 'read_data ${structure}'
+    assert commands[3].split() == ['pair_style', 'lj/cut', '5.0'] # Continuation line joined
+    assert force_field_commands(commands) == commands[3:5]
+
+@pytest.mark.parametrize('text, expected', [
+    (SINGLE_POINT, True),
+    (SINGLE_POINT.replace('run 0', 'run 100'), False),
+    (SINGLE_POINT.replace('run 0', 'minimize 1e-6 1e-6 100 100\nrun 0'), False),
+    (SINGLE_POINT + 'run 0\n', False),
+])
+def test_is_single_point(script, text, expected):
+    assert is_single_point(script(text)) == expected
+
+def test_read_lammps_data(data_file):
+    shuffled = [3, 0, 2, 1]
+    path = data_file('s.lmp', [POSITIONS[i] for i in shuffled], [TYPES[i] for i in shuffled], charges=[0.1, 0.2, 0.3, 0.4])
+    data = read_lammps_data(path)
+
+    assert data['atom_style'] == 'charge'
+    assert data['box'] == [(0.0, 6.0)] * 3
+    assert data['masses'] == {1: 78.96, 2: 208.9804}
+    assert list(data['ids']) == [1, 2, 3, 4] # Rows keep their IDs, read back in ID order
+    np.testing.assert_allclose(data['positions'], [POSITIONS[i] for i in shuffled])
+    np.testing.assert_allclose(data['charges'], [0.1, 0.2, 0.3, 0.4])
+
+@pytest.fixture
+def lammps_instance():
+    lammps = pytest.importorskip('lammps')
+    instances = []
+    def make():
+        try:
+            lmp = lammps.lammps(cmdargs=['-log', 'none', '-screen', 'none', '-nocite'])
+        except OSError as e: # The Python module is installed but the shared library cannot be loaded
+            pytest.skip(f'LAMMPs library unavailable: {e}')
+        instances.append(lmp)
+        return lmp
+    yield make
+    for lmp in instances:
+        lmp.close()
+
+def evaluate(lmp, runner, inp, struct, epsilon):
+    lmp.command(f'variable structure string {struct}')
+    lmp.command(f'variable epsilon string {epsilon}')
+    fast = runner.run(inp, epsilon, None, struct, 'Se Bi')
+    return fast, lmp.get_thermo('pe'), np.array(lmp.gather_atoms('f', 1, 3)).reshape(-1, 3)
+
+def test_runner_reuses_system(lammps_instance, script, data_file):
+    inp = script(SINGLE_POINT)
+    first = data_file('s1.lmp', POSITIONS, TYPES)
+    moved = data_file('s2.lmp', [(x + 0.1, y, z) for x, y, z in POSITIONS], TYPES)
+    other_types = data_file('s3.lmp', POSITIONS, [1, 1, 2, 2])
+
+    lmp = lammps_instance()
+    runner = SinglePointRunner(lmp)
+    steps = [(first, 0.01), (moved, 0.01), (moved, 0.02), (other_types, 0.02)]
+    results = [evaluate(lmp, runner, inp, struct, epsilon) for struct, epsilon in steps]
+
+    # New positions and a new force field take the fast path; new atom types need the full script
+    assert [fast for fast, _, _ in results] == [False, True, True, False]
+    assert (runner.n_fast, runner.n_full) == (2, 2)
+
+    # Each result matches a fresh LAMMPs instance running the full script
+    for (struct, epsilon), (_, energy, forces) in zip(steps, results):
+        lmp = lammps_instance()
+        _, ref_energy, ref_forces = evaluate(lmp, SinglePointRunner(lmp), inp, struct, epsilon)
+        assert energy == pytest.approx(ref_energy, rel=1e-10)
+        np.testing.assert_allclose(forces, ref_forces, rtol=1e-8, atol=1e-12)
@@ -0,0 +1,35 @@
+import os
+from EnsembleFFFit.matensemble.staging import STAGE_ENV, stage_file, stage_lists
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+def test_no_stage_dir_keeps_paths(tmp_path, monkeypatch):
+    monkeypatch.delenv(STAGE_ENV, raising=False)
+    ffield = write(tmp_path / 'ffield', 'ff')
+    assert stage_lists([ffield, 'missing']) == [[ffield, 'missing']]
+
+def test_stage_lists(tmp_path):
+    stage_dir = str(tmp_path / 'stage')
+    a = write(tmp_path / 'run1' / 'ffield', 'same contents')
+    b = write(tmp_path / 'run2' / 'ffield', 'same contents')
+    control = write(tmp_path / 'control', 'control')
+
+    ff_list, control_list = stage_lists([a, b, a], [control, control, control], stage_dir=stage_dir)
+    assert all(path.startswith(stage_dir) for path in ff_list + control_list)
+    assert ff_list[0] == ff_list[1] == ff_list[2] # Identical contents are stored once
+    assert os.path.basename(ff_list[0]) == 'ffield' # The name is kept
+    assert open(control_list[0]).read() == 'control'
+
+def test_changed_source_is_staged_again(tmp_path, monkeypatch):
+    monkeypatch.setenv(STAGE_ENV, str(tmp_path / 'stage'))
+    ffield = write(tmp_path / 'ffield', 'first')
+    first = stage_file(ffield)
+    assert stage_file(ffield) == first
+
+    write(tmp_path / 'ffield', 'second version')
+    second = stage_file(ffield)
+    assert second != first and open(second).read() == 'second version'
+    assert open(first).read() == 'first'